@@ -2,14 +2,12 @@ import os
 import sys
 import argparse as arg
 import logging
-import numpy as np
 from datetime import datetime
 import tensorflow as tf
 from tensorflow.keras.layers import Dense, Flatten, Conv1D, Dropout, TimeDistributed, LSTM
-from sklearn.metrics import confusion_matrix
 
 from data_loader import load_data
-from metrics import TSS
+from metrics import TSS, HOST_CHECKPOINT_OPTIONS, print_test_scores
 
 tf.get_logger().setLevel(logging.ERROR)
 
@@ -33,7 +31,7 @@ class CNN_LSTM_(tf.keras.models.Sequential):
 
 
 def train(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1,
-          checkpoint_dir='checkpoints/cnnlstm/training'):
+          checkpoint_dir='checkpoints/cnnlstm/training', xla_flag=False):
     '''
     Training method for cnnlstm model.
     @param train_ds: training dataset
@@ -43,13 +41,15 @@ def train(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1,
     @param num_epochs: number of training epochs
     @param patience: patience
     @param checkpoint_dir: checkpoint directory of cnnlstm model
+    @param xla_flag: whether to compile the training step with xla
     '''
     model = CNN_LSTM_()
     model.create_model()
 
     optimizer = tf.keras.optimizers.Adam(learning_rate=0.0001)
 
-    model.compile(optimizer=optimizer, loss=tf.keras.losses.BinaryCrossentropy(from_logits=False),
+    # off by default, a jit compiled step cannot use the cudnn lstm kernel and falls back to the generic loop
+    model.compile(optimizer=optimizer, loss=tf.keras.losses.BinaryCrossentropy(from_logits=False), jit_compile=xla_flag,
                   metrics=['accuracy', tf.keras.metrics.TrueNegatives(name='tn'),
                            tf.keras.metrics.FalsePositives(name='fp'),
                            tf.keras.metrics.FalseNegatives(name='fn'), tf.keras.metrics.TruePositives(name='tp'),
@@ -72,7 +72,8 @@ def train(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1,
         save_best_only=True,
         mode='max',
         save_weights_only=True,
-        save_freq='epoch')
+        save_freq='epoch',
+        options=HOST_CHECKPOINT_OPTIONS)
 
     # Create a callback for early stopping
     es_callback = tf.keras.callbacks.EarlyStopping(
@@ -94,16 +95,9 @@ def train(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1,
     print('Model evaluation on val set:')
     model.evaluate(val_ds)
     print('Model evaluation on test set:')
-    model.evaluate(test_ds)
+    test_results = model.evaluate(test_ds, return_dict=True)
 
-    y_pred = model.predict(test_ds)
-
-    y_true = np.concatenate([y for x, y in test_ds], axis=0)
-
-    y_pred = np.round(y_pred)[:, 0]
-
-    print('Confusion matrix:')
-    print(confusion_matrix(y_true, y_pred))
+    print_test_scores(test_results)
 
     model.summary()
 
@@ -124,6 +118,8 @@ def main(argv):
                         required=False, default=10)
     parser.add_argument('--window_size', metavar='<int>', type=int, help='bucket height', required=False, default=5)
     parser.add_argument('--slices', metavar='<int>', type=int, help='bucket width', required=False, default=20)
+    parser.add_argument('--xla_flag', metavar='<bool>', type=bool, help='whether to compile the training step with xla',
+                        required=False, default=False)
     parser.add_argument('--class_counts_file', metavar='<file>', type=str, help='path to class counts file',
                         required=False, default='class_counts.csv')
     parser.add_argument('--cache_dir', metavar='<directory>', type=str, help='path to cache directory',
@@ -136,7 +132,7 @@ def main(argv):
     train_ds, val_ds, test_ds, class_weight = load_data(args.dir, args.region, input_shape=input_shape, batch_size=args.batch_size,
                                                         in_memory_flag=args.in_memory_flag, transpose_flag=True,
                                                         class_counts_file=args.class_counts_file, cache_dir=args.cache_dir)
-    train(train_ds, val_ds, test_ds, class_weight, args.num_epochs, args.patience, args.checkpoint_dir)
+    train(train_ds, val_ds, test_ds, class_weight, args.num_epochs, args.patience, args.checkpoint_dir, args.xla_flag)
 
 
 if __name__ == '__main__':
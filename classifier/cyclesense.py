@@ -4,341 +4,103 @@ import argparse as arg
 import logging
 import numpy as np
 from datetime import datetime
+from functools import partial
 import tensorflow as tf
 from tensorflow.keras import Model
-from tensorflow.keras.layers import Dense, Flatten, Conv3D, RNN, GRUCell, StackedRNNCells, Reshape, BatchNormalization, \
-    ReLU, Dropout, add, Input
-from sklearn.metrics import confusion_matrix
+from tensorflow.keras.layers import Dense, Flatten, Conv2D, Conv3D, GRU, Reshape, BatchNormalization, \
+    ReLU, Dropout, add, Input, Activation
 
 from data_loader import load_data
-from metrics import TSS
+from metrics import TSS, HOST_CHECKPOINT_OPTIONS, print_test_scores
 
 tf.get_logger().setLevel(logging.ERROR)
 
 
-def submodel_acc(input_shape=(None, 5, 20, 14), output_bias=None):
+def sensor_channels(fourier_transform_flag=True, lin_acc_flag=False):
     '''
-    Definition of the cyclesense accelerometer submodel.
-    @param input_shape: bucket shape
-    @param output_bias: output bias initialization
-    @return: cyclesense accelerometer submodel
-    '''
-    if output_bias is not None:
-        output_bias = tf.keras.initializers.Constant(output_bias)
-
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
-
-    acc = x[:, :, :, :3]
-
-    acc = acc[:, :, :, :, tf.newaxis]
-
-    acc_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape)(acc)
-    acc_conv1 = BatchNormalization()(acc_conv1)
-    acc_conv1 = ReLU()(acc_conv1)
-    acc_conv1 = Dropout(0.5)(acc_conv1)
-
-    acc_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(acc_conv1)
-    acc_conv2 = BatchNormalization()(acc_conv2)
-    acc_conv2 = ReLU()(acc_conv2)
-    acc_conv2 = Dropout(0.5)(acc_conv2)
-
-    acc_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(acc_conv2)
-    acc_conv3 = BatchNormalization()(acc_conv3)
-    acc_conv3 = ReLU()(acc_conv3)
-
-    acc_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid')(acc)
-    acc_shortcut = BatchNormalization()(acc_shortcut)
-    acc_shortcut = ReLU()(acc_shortcut)
-
-    acc = add([acc_conv3, acc_shortcut])
-
-    acc_fc = Flatten()(acc)
-    acc_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(acc_fc)
-
-    model = Model(x, acc_fc)
-
-    return model
-
-
-def submodel_acc_imag(input_shape=(None, 5, 20, 14), output_bias=None, lin_acc_flag=False):
-    '''
-    Definition of the cyclesense accelerometer imaginary submodel.
-    @param input_shape: bucket shape
-    @param output_bias: output bias initialization
-    @param lin_acc_flag: whether the linear accelerometer data was exported, too
-    @return: cyclesense acclerometer imaginary submodel
-    '''
-    if output_bias is not None:
-        output_bias = tf.keras.initializers.Constant(output_bias)
-
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
-
-    acc = x[:, :, :, 6:9] if not lin_acc_flag else x[:, :, :, 9:12]
-
-    acc = acc[:, :, :, :, tf.newaxis]
-
-    acc_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape)(acc)
-    acc_conv1 = BatchNormalization()(acc_conv1)
-    acc_conv1 = ReLU()(acc_conv1)
-    acc_conv1 = Dropout(0.5)(acc_conv1)
-
-    acc_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(acc_conv1)
-    acc_conv2 = BatchNormalization()(acc_conv2)
-    acc_conv2 = ReLU()(acc_conv2)
-    acc_conv2 = Dropout(0.5)(acc_conv2)
-
-    acc_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(acc_conv2)
-    acc_conv3 = BatchNormalization()(acc_conv3)
-    acc_conv3 = ReLU()(acc_conv3)
-
-    acc_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid')(acc)
-    acc_shortcut = BatchNormalization()(acc_shortcut)
-    acc_shortcut = ReLU()(acc_shortcut)
-
-    acc = add([acc_conv3, acc_shortcut])
-
-    acc_fc = Flatten()(acc)
-    acc_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(acc_fc)
-
-    model = Model(x, acc_fc)
-
-    return model
-
-
-def submodel_gyro(input_shape=(None, 5, 20, 14), output_bias=None):
-    '''
-    Definition of the cyclesense gyroscope submodel.
-    @param input_shape: bucket shape
-    @param output_bias: output bias initialization
-    @return: cyclesense gyro submodel
-    '''
-    if output_bias is not None:
-        output_bias = tf.keras.initializers.Constant(output_bias)
-
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
-
-    gyro = x[:, :, :, 3:6]
-
-    gyro = gyro[:, :, :, :, tf.newaxis]
-
-    gyro_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape)(gyro)
-    gyro_conv1 = BatchNormalization()(gyro_conv1)
-    gyro_conv1 = ReLU()(gyro_conv1)
-    gyro_conv1 = Dropout(0.5)(gyro_conv1)
-
-    gyro_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(gyro_conv1)
-    gyro_conv2 = BatchNormalization()(gyro_conv2)
-    gyro_conv2 = ReLU()(gyro_conv2)
-    gyro_conv2 = Dropout(0.5)(gyro_conv2)
-
-    gyro_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(gyro_conv2)
-    gyro_conv3 = BatchNormalization()(gyro_conv3)
-    gyro_conv3 = ReLU()(gyro_conv3)
-
-    gyro_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid')(gyro)
-    gyro_shortcut = BatchNormalization()(gyro_shortcut)
-    gyro_shortcut = ReLU()(gyro_shortcut)
-
-    gyro = add([gyro_conv3, gyro_shortcut])
-
-    gyro_fc = Flatten()(gyro)
-    gyro_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(gyro_fc)
-
-    model = Model(x, gyro_fc)
-
-    return model
-
-
-def submodel_gyro_imag(input_shape=(None, 5, 20, 14), output_bias=None, lin_acc_flag=False):
-    '''
-    Definition of the cyclesense gyroscope imaginary submodel.
-    @param input_shape: bucket shape
-    @param output_bias: output bias initialization
+    Channel ranges of the sensors in the buckets.
+    @param fourier_transform_flag: whether fourier transform was applied on the data
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
-    @return: cyclesense gyroscope imaginary submodel
+    @return: dictionary of sensor names and tuples of first and last channel
     '''
-    if output_bias is not None:
-        output_bias = tf.keras.initializers.Constant(output_bias)
-
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
-
-    gyro = x[:, :, :, 9:12] if not lin_acc_flag else x[:, :, :, 12:15]
-
-    gyro = gyro[:, :, :, :, tf.newaxis]
-
-    gyro_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape)(gyro)
-    gyro_conv1 = BatchNormalization()(gyro_conv1)
-    gyro_conv1 = ReLU()(gyro_conv1)
-    gyro_conv1 = Dropout(0.5)(gyro_conv1)
-
-    gyro_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(gyro_conv1)
-    gyro_conv2 = BatchNormalization()(gyro_conv2)
-    gyro_conv2 = ReLU()(gyro_conv2)
-    gyro_conv2 = Dropout(0.5)(gyro_conv2)
-
-    gyro_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(gyro_conv2)
-    gyro_conv3 = BatchNormalization()(gyro_conv3)
-    gyro_conv3 = ReLU()(gyro_conv3)
-
-    gyro_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid')(gyro)
-    gyro_shortcut = BatchNormalization()(gyro_shortcut)
-    gyro_shortcut = ReLU()(gyro_shortcut)
+    sensors = ['acc', 'gyro'] + ['linacc'] * lin_acc_flag
+    sensors += [sensor + '_imag' for sensor in sensors] * fourier_transform_flag
 
-    gyro = add([gyro_conv3, gyro_shortcut])
+    channels = {sensor: (3 * i, 3 * i + 3) for i, sensor in enumerate(sensors)}
+    channels['gps'] = (3 * len(sensors), 3 * len(sensors) + 2)
 
-    gyro_fc = Flatten()(gyro)
-    gyro_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(gyro_fc)
+    return channels
 
-    model = Model(x, gyro_fc)
 
-    return model
-
-
-def submodel_gps(input_shape=(None, 5, 20, 14), output_bias=None, fourier_transform_flag=True, lin_acc_flag=False):
+def sensor_slice(x, channels):
     '''
-    Definition of the cyclesense gps submodel.
-    @param input_shape: bucket shape
-    @param output_bias: output bias initialization
-    @param fourier_transform_flag: whether fourier transform was applied on the data
-    @param lin_acc_flag: whether the linear accelerometer data was exported, too
-    @return: cyclesense gps submodel
+    Cut the channels of a single sensor out of the buckets.
+    @param x: buckets
+    @param channels: tuple of first and last channel of the sensor
+    @return: sensor channels with a trailing depth axis
     '''
-    if output_bias is not None:
-        output_bias = tf.keras.initializers.Constant(output_bias)
-
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
+    return x[:, :, :, channels[0]:channels[1], tf.newaxis]
 
-    if fourier_transform_flag:
-        if lin_acc_flag:
-            gps = x[:, :, :, 18:]
-        else:
-            gps = x[:, :, :, 12:]
-    else:
-        if lin_acc_flag:
-            gps = x[:, :, :, 9:]
-        else:
-            gps = x[:, :, :, 6:]
 
-    gps = tf.math.real(gps)[:, :, :, :, tf.newaxis]
-
-    gps_conv1 = Conv3D(64, kernel_size=(3, 3, 2), padding='valid')(gps)
-    gps_conv1 = BatchNormalization()(gps_conv1)
-    gps_conv1 = ReLU()(gps_conv1)
-    gps_conv1 = Dropout(0.5)(gps_conv1)
-
-    gps_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(gps_conv1)
-    gps_conv2 = BatchNormalization()(gps_conv2)
-    gps_conv2 = ReLU()(gps_conv2)
-    gps_conv2 = Dropout(0.5)(gps_conv2)
-
-    gps_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(gps_conv2)
-    gps_conv3 = BatchNormalization()(gps_conv3)
-    gps_conv3 = ReLU()(gps_conv3)
-
-    gps_shortcut = Conv3D(64, kernel_size=(3, 3, 2), padding='valid')(gps)
-    gps_shortcut = BatchNormalization()(gps_shortcut)
-    gps_shortcut = ReLU()(gps_shortcut)
-
-    gps = add([gps_conv3, gps_shortcut])
-
-    gps_fc = Flatten()(gps)
-    gps_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(gps_fc)
-
-    model = Model(x, gps_fc)
-
-    return model
-
-
-def submodel_linacc(input_shape=(None, 5, 20, 20), output_bias=None):
+def sensor_branch(sensor, kernel_size=(3, 3, 3), trainable=True):
     '''
-    Definition of the cyclesense linacc submodel.
-    @param input_shape: bucket shape
-    @param output_bias: output bias initialization
-    @return: cyclesense linacc submodel
+    Residual convolution branch of a single sensor.
+    @param sensor: sensor channels with a trailing depth axis
+    @param kernel_size: kernel size of the first convolution, which collapses the channel depth
+    @param trainable: whether the convolution weights are trainable
+    @return: branch output
     '''
-    if output_bias is not None:
-        output_bias = tf.keras.initializers.Constant(output_bias)
-
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
-
-    linacc = x[:, :, :, 6:9]
-
-    linacc = linacc[:, :, :, :, tf.newaxis]
-
-    linacc_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape)(linacc)
-    linacc_conv1 = BatchNormalization()(linacc_conv1)
-    linacc_conv1 = ReLU()(linacc_conv1)
-    linacc_conv1 = Dropout(0.5)(linacc_conv1)
-
-    linacc_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(linacc_conv1)
-    linacc_conv2 = BatchNormalization()(linacc_conv2)
-    linacc_conv2 = ReLU()(linacc_conv2)
-    linacc_conv2 = Dropout(0.5)(linacc_conv2)
-
-    linacc_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(linacc_conv2)
-    linacc_conv3 = BatchNormalization()(linacc_conv3)
-    linacc_conv3 = ReLU()(linacc_conv3)
+    conv1 = Conv3D(64, kernel_size=kernel_size, padding='valid', data_format='channels_last', trainable=trainable)(sensor)
+    conv1 = BatchNormalization(axis=-1)(conv1)
+    conv1 = ReLU()(conv1)
+    conv1 = Dropout(0.5)(conv1)
+    conv1 = tf.squeeze(conv1, axis=3)
 
-    linacc_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid')(linacc)
-    linacc_shortcut = BatchNormalization()(linacc_shortcut)
-    linacc_shortcut = ReLU()(linacc_shortcut)
+    conv2 = Conv2D(64, kernel_size=(3, 3), padding='same', data_format='channels_last', trainable=trainable)(conv1)
+    conv2 = BatchNormalization(axis=-1)(conv2)
+    conv2 = ReLU()(conv2)
+    conv2 = Dropout(0.5)(conv2)
 
-    linacc = add([linacc_conv3, linacc_shortcut])
+    conv3 = Conv2D(64, kernel_size=(3, 3), padding='same', data_format='channels_last', trainable=trainable)(conv2)
+    conv3 = BatchNormalization(axis=-1)(conv3)
+    conv3 = ReLU()(conv3)
 
-    linacc_fc = Flatten()(linacc)
-    linacc_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(linacc_fc)
+    shortcut = Conv3D(64, kernel_size=kernel_size, padding='valid', data_format='channels_last', trainable=trainable)(sensor)
+    shortcut = BatchNormalization(axis=-1)(shortcut)
+    shortcut = ReLU()(shortcut)
+    shortcut = tf.squeeze(shortcut, axis=3)
 
-    model = Model(x, linacc_fc)
-
-    return model
+    return add([conv3, shortcut])
 
 
-def submodel_linacc_imag(input_shape=(None, 5, 20, 20), output_bias=None):
+def submodel(input_shape=(None, 20, 5, 14), output_bias=None, channels=(0, 3), kernel_size=(3, 3, 3)):
     '''
-    Definition of the cyclesense linacc imaginary submodel.
+    Definition of a cyclesense submodel, which classifies the buckets based on a single sensor.
     @param input_shape: bucket shape
     @param output_bias: output bias initialization
-    @return: cyclesense linacc imaginary submodel
+    @param channels: tuple of first and last channel of the sensor
+    @param kernel_size: kernel size of the first convolution, (3, 3, 2) for the gps
+    @return: cyclesense submodel
     '''
     if output_bias is not None:
         output_bias = tf.keras.initializers.Constant(output_bias)
 
     x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
 
-    linacc = x[:, :, :, 15:18]
-
-    linacc = linacc[:, :, :, :, tf.newaxis]
-
-    linacc_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape)(linacc)
-    linacc_conv1 = BatchNormalization()(linacc_conv1)
-    linacc_conv1 = ReLU()(linacc_conv1)
-    linacc_conv1 = Dropout(0.5)(linacc_conv1)
-
-    linacc_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(linacc_conv1)
-    linacc_conv2 = BatchNormalization()(linacc_conv2)
-    linacc_conv2 = ReLU()(linacc_conv2)
-    linacc_conv2 = Dropout(0.5)(linacc_conv2)
-
-    linacc_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(linacc_conv2)
-    linacc_conv3 = BatchNormalization()(linacc_conv3)
-    linacc_conv3 = ReLU()(linacc_conv3)
+    sensor = sensor_slice(x, channels)
+    sensor = sensor_branch(sensor, kernel_size)
 
-    linacc_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid')(linacc)
-    linacc_shortcut = BatchNormalization()(linacc_shortcut)
-    linacc_shortcut = ReLU()(linacc_shortcut)
+    sensor_fc = Flatten()(sensor)
+    sensor_fc = Dense(1, bias_initializer=output_bias)(sensor_fc)
+    sensor_fc = Activation('sigmoid', dtype='float32')(sensor_fc)
 
-    linacc = add([linacc_conv3, linacc_shortcut])
-
-    linacc_fc = Flatten()(linacc)
-    linacc_fc = Dense(1, activation='sigmoid', bias_initializer=output_bias)(linacc_fc)
-
-    model = Model(x, linacc_fc)
+    model = Model(x, sensor_fc)
 
     return model
 
 
-def cyclesense_model(input_shape=(None, 5, 20, 14), output_bias=None, stacking=True, freeze=True,
-                    fourier_transform_flag=True, lin_acc_flag=False,
+def cyclesense_model(input_shape=(None, 20, 5, 14), output_bias=None, stacking=True, freeze=True,
+                    fourier_transform_flag=True, lin_acc_flag=False, share_imu_weights=False,
                     ckpt_cyclesense_acc='checkpoints/cyclesense_sub_acc/training',
                     ckpt_cyclesense_acc_imag='checkpoints/cyclesense_sub_acc_imag/training',
                     ckpt_cyclesense_gyro='checkpoints/cyclesense_sub_gyro/training',
@@ -353,6 +115,7 @@ def cyclesense_model(input_shape=(None, 5, 20, 14), output_bias=None, stacking=T
     @param freeze: whether to freeze the submodel weights
     @param fourier_transform_flag: whether fourier transform was applied on the data
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param share_imu_weights: whether the accelerometer and gyroscope branches share their convolution weights
     @param ckpt_cyclesense_acc: checkpoint path cyclesense accelerometer submodel
     @param ckpt_cyclesense_acc_imag: checkpoint path cyclesense accelerometer imaginary submodel
     @param ckpt_cyclesense_gyro: checkpoint path cyclesense gyroscope submodel
@@ -361,314 +124,221 @@ def cyclesense_model(input_shape=(None, 5, 20, 14), output_bias=None, stacking=T
     @param ckpt_cyclesense_linacc_imag: checkpoint path cyclesense linacc imaginary submodel
     @param ckpt_cyclesense_gps: checkpoint path cyclesense gps submodel
     '''
-
+    if share_imu_weights and stacking:
+        raise ValueError('shared accelerometer and gyroscope weights cannot be loaded from the separately trained submodels')
 
     if output_bias is not None:
         output_bias = tf.keras.initializers.Constant(output_bias)
 
-    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
-
-    if lin_acc_flag:
-        if fourier_transform_flag:
-            acc_real = x[:, :, :, 0:3]
-            gyro_real = x[:, :, :, 3:6]
-            linacc_real = x[:, :, :, 6:9]
-            acc_imag = x[:, :, :, 9:12]
-            gyro_imag = x[:, :, :, 12:15]
-            linacc_imag = x[:, :, :, 15:18]
-            gps = x[:, :, :, 18:]
-        else:
-            acc_real = x[:, :, :, 0:3]
-            gyro_real = x[:, :, :, 3:6]
-            linacc_real = x[:, :, :, 6:9]
-            gps = x[:, :, :, 9:]
-
-    else:
-        if fourier_transform_flag:
-            acc_real = x[:, :, :, 0:3]
-            gyro_real = x[:, :, :, 3:6]
-            acc_imag = x[:, :, :, 6:9]
-            gyro_imag = x[:, :, :, 9:12]
-            gps = x[:, :, :, 12:]
-        else:
-            acc_real = x[:, :, :, 0:3]
-            gyro_real = x[:, :, :, 3:6]
-            gps = x[:, :, :, 6:]
-
-    acc_real = acc_real[:, :, :, :, tf.newaxis]
-    gyro_real = gyro_real[:, :, :, :, tf.newaxis]
-    if lin_acc_flag:
-        linacc_real = linacc_real[:, :, :, :, tf.newaxis]
-
-    if fourier_transform_flag:
-        acc_imag = acc_imag[:, :, :, :, tf.newaxis]
-        gyro_imag = gyro_imag[:, :, :, :, tf.newaxis]
-        if lin_acc_flag:
-            linacc_imag = linacc_imag[:, :, :, :, tf.newaxis]
-
-    gps = tf.math.real(gps)[:, :, :, :, tf.newaxis]
-
-    acc_real_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape, trainable=not freeze)(acc_real)
-    acc_real_conv1 = BatchNormalization()(acc_real_conv1)
-    acc_real_conv1 = ReLU()(acc_real_conv1)
-    acc_real_conv1 = Dropout(0.5)(acc_real_conv1)
-
-    acc_real_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(acc_real_conv1)
-    acc_real_conv2 = BatchNormalization()(acc_real_conv2)
-    acc_real_conv2 = ReLU()(acc_real_conv2)
-    acc_real_conv2 = Dropout(0.5)(acc_real_conv2)
-
-    acc_real_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(acc_real_conv2)
-    acc_real_conv3 = BatchNormalization()(acc_real_conv3)
-    acc_real_conv3 = ReLU()(acc_real_conv3)
-
-    acc_real_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', trainable=not freeze)(acc_real)
-    acc_real_shortcut = BatchNormalization()(acc_real_shortcut)
-    acc_real_shortcut = ReLU()(acc_real_shortcut)
-
-    acc_real = add([acc_real_conv3, acc_real_shortcut])
-
-    gyro_real_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape, trainable=not freeze)(gyro_real)
-    gyro_real_conv1 = BatchNormalization()(gyro_real_conv1)
-    gyro_real_conv1 = ReLU()(gyro_real_conv1)
-    gyro_real_conv1 = Dropout(0.5)(gyro_real_conv1)
-
-    gyro_real_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(gyro_real_conv1)
-    gyro_real_conv2 = BatchNormalization()(gyro_real_conv2)
-    gyro_real_conv2 = ReLU()(gyro_real_conv2)
-    gyro_real_conv2 = Dropout(0.5)(gyro_real_conv2)
-
-    gyro_real_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(gyro_real_conv2)
-    gyro_real_conv3 = BatchNormalization()(gyro_real_conv3)
-    gyro_real_conv3 = ReLU()(gyro_real_conv3)
-
-    gyro_real_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', trainable=not freeze)(gyro_real)
-    gyro_real_shortcut = BatchNormalization()(gyro_real_shortcut)
-    gyro_real_shortcut = ReLU()(gyro_real_shortcut)
-
-    gyro_real = add([gyro_real_conv3, gyro_real_shortcut])
-
-    if lin_acc_flag:
-        linacc_real_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape,
-                                   trainable=not freeze)(linacc_real)
-        linacc_real_conv1 = BatchNormalization()(linacc_real_conv1)
-        linacc_real_conv1 = ReLU()(linacc_real_conv1)
-        linacc_real_conv1 = Dropout(0.5)(linacc_real_conv1)
-
-        linacc_real_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(linacc_real_conv1)
-        linacc_real_conv2 = BatchNormalization()(linacc_real_conv2)
-        linacc_real_conv2 = ReLU()(linacc_real_conv2)
-        linacc_real_conv2 = Dropout(0.5)(linacc_real_conv2)
-
-        linacc_real_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(linacc_real_conv2)
-        linacc_real_conv3 = BatchNormalization()(linacc_real_conv3)
-        linacc_real_conv3 = ReLU()(linacc_real_conv3)
-
-        linacc_real_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', trainable=not freeze)(linacc_real)
-        linacc_real_shortcut = BatchNormalization()(linacc_real_shortcut)
-        linacc_real_shortcut = ReLU()(linacc_real_shortcut)
-
-        linacc_real = add([linacc_real_conv3, linacc_real_shortcut])
-
-    if fourier_transform_flag:
-
-        acc_imag_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape, trainable=not freeze)(acc_imag)
-        acc_imag_conv1 = BatchNormalization()(acc_imag_conv1)
-        acc_imag_conv1 = ReLU()(acc_imag_conv1)
-        acc_imag_conv1 = Dropout(0.5)(acc_imag_conv1)
-
-        acc_imag_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(acc_imag_conv1)
-        acc_imag_conv2 = BatchNormalization()(acc_imag_conv2)
-        acc_imag_conv2 = ReLU()(acc_imag_conv2)
-        acc_imag_conv2 = Dropout(0.5)(acc_imag_conv2)
-
-        acc_imag_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(acc_imag_conv2)
-        acc_imag_conv3 = BatchNormalization()(acc_imag_conv3)
-        acc_imag_conv3 = ReLU()(acc_imag_conv3)
-
-        acc_imag_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', trainable=not freeze)(acc_imag)
-        acc_imag_shortcut = BatchNormalization()(acc_imag_shortcut)
-        acc_imag_shortcut = ReLU()(acc_imag_shortcut)
-
-        acc_imag = add([acc_imag_conv3, acc_imag_shortcut])
-
-        gyro_imag_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape, trainable=not freeze)(gyro_imag)
-        gyro_imag_conv1 = BatchNormalization()(gyro_imag_conv1)
-        gyro_imag_conv1 = ReLU()(gyro_imag_conv1)
-        gyro_imag_conv1 = Dropout(0.5)(gyro_imag_conv1)
-
-        gyro_imag_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(gyro_imag_conv1)
-        gyro_imag_conv2 = BatchNormalization()(gyro_imag_conv2)
-        gyro_imag_conv2 = ReLU()(gyro_imag_conv2)
-        gyro_imag_conv2 = Dropout(0.5)(gyro_imag_conv2)
-
-        gyro_imag_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(gyro_imag_conv2)
-        gyro_imag_conv3 = BatchNormalization()(gyro_imag_conv3)
-        gyro_imag_conv3 = ReLU()(gyro_imag_conv3)
-
-        gyro_imag_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', trainable=not freeze)(gyro_imag)
-        gyro_imag_shortcut = BatchNormalization()(gyro_imag_shortcut)
-        gyro_imag_shortcut = ReLU()(gyro_imag_shortcut)
-
-        gyro_imag = add([gyro_imag_conv3, gyro_imag_shortcut])
-
-        if lin_acc_flag:
-            linacc_imag_conv1 = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', input_shape=input_shape,
-                                       trainable=not freeze)(
-                linacc_imag)
-            linacc_imag_conv1 = BatchNormalization()(linacc_imag_conv1)
-            linacc_imag_conv1 = ReLU()(linacc_imag_conv1)
-            linacc_imag_conv1 = Dropout(0.5)(linacc_imag_conv1)
-
-            linacc_imag_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(linacc_imag_conv1)
-            linacc_imag_conv2 = BatchNormalization()(linacc_imag_conv2)
-            linacc_imag_conv2 = ReLU()(linacc_imag_conv2)
-            linacc_imag_conv2 = Dropout(0.5)(linacc_imag_conv2)
-
-            linacc_imag_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(linacc_imag_conv2)
-            linacc_imag_conv3 = BatchNormalization()(linacc_imag_conv3)
-            linacc_imag_conv3 = ReLU()(linacc_imag_conv3)
-
-            linacc_imag_shortcut = Conv3D(64, kernel_size=(3, 3, 3), padding='valid', trainable=not freeze)(linacc_imag)
-            linacc_imag_shortcut = BatchNormalization()(linacc_imag_shortcut)
-            linacc_imag_shortcut = ReLU()(linacc_imag_shortcut)
+    ckpts = {'acc': ckpt_cyclesense_acc, 'acc_imag': ckpt_cyclesense_acc_imag, 'gyro': ckpt_cyclesense_gyro,
+             'gyro_imag': ckpt_cyclesense_gyro_imag, 'linacc': ckpt_cyclesense_linacc,
+             'linacc_imag': ckpt_cyclesense_linacc_imag, 'gps': ckpt_cyclesense_gps}
 
-            linacc_imag = add([linacc_imag_conv3, linacc_imag_shortcut])
-
-    gps_conv1 = Conv3D(64, kernel_size=(3, 3, 2), padding='valid', trainable=not freeze)(gps)
-    gps_conv1 = BatchNormalization()(gps_conv1)
-    gps_conv1 = ReLU()(gps_conv1)
-    gps_conv1 = Dropout(0.5)(gps_conv1)
-
-    gps_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(gps_conv1)
-    gps_conv2 = BatchNormalization()(gps_conv2)
-    gps_conv2 = ReLU()(gps_conv2)
-    gps_conv2 = Dropout(0.5)(gps_conv2)
-
-    gps_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same', trainable=not freeze)(gps_conv2)
-    gps_conv3 = BatchNormalization()(gps_conv3)
-    gps_conv3 = ReLU()(gps_conv3)
-
-    gps_shortcut = Conv3D(64, kernel_size=(3, 3, 2), padding='valid', trainable=not freeze)(gps)
-    gps_shortcut = BatchNormalization()(gps_shortcut)
-    gps_shortcut = ReLU()(gps_shortcut)
-
-    gps = add([gps_conv3, gps_shortcut])
-
-    if stacking:
-        acc_fc = Flatten()(acc_real)
-        acc_fc = Dense(1, activation='sigmoid')(acc_fc)
-
-        model_acc = Model(x, acc_fc)
-        model_acc.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_acc)))
-
-        gyro_fc = Flatten()(gyro_real)
-        gyro_fc = Dense(1, activation='sigmoid')(gyro_fc)
-
-        model_gyro = Model(x, gyro_fc)
-        model_gyro.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_gyro)))
-
-        if lin_acc_flag:
-            linacc_fc = Flatten()(linacc_real)
-            linacc_fc = Dense(1, activation='sigmoid')(linacc_fc)
-
-            model_linacc = Model(x, linacc_fc)
-            model_linacc.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_linacc)))
-
-        if fourier_transform_flag:
-
-            acc_imag_fc = Flatten()(acc_imag)
-            acc_imag_fc = Dense(1, activation='sigmoid')(acc_imag_fc)
-
-            model_acc_imag = Model(x, acc_imag_fc)
-            model_acc_imag.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_acc_imag)))
+    x = Input(shape=(input_shape[1], input_shape[2], input_shape[3]))
 
-            gyro_imag_fc = Flatten()(gyro_imag)
-            gyro_imag_fc = Dense(1, activation='sigmoid')(gyro_imag_fc)
+    # every sensor is cut exactly like in the submodel, so the layers of a stacked branch line up with its checkpoint
+    channels = sensor_channels(fourier_transform_flag, lin_acc_flag)
+    sensors = {name: sensor_slice(x, channels[name]) for name in channels}
 
-            model_gyro_imag = Model(x, gyro_imag_fc)
-            model_gyro_imag.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_gyro_imag)))
+    branches = {}
+    for name in channels:
+        if share_imu_weights and name.startswith('gyro'):
+            continue
 
+        if share_imu_weights and name.startswith('acc'):
+            # accelerometer and gyroscope are both three axis sensors, one set of convolutions processes both stacked along the batch axis
+            gyro_name = name.replace('acc', 'gyro')
+            imu = sensor_branch(tf.concat([sensors[name], sensors[gyro_name]], axis=0), trainable=not freeze)
+            branches[name], branches[gyro_name] = tf.split(imu, 2, axis=0)
+            continue
 
-            if lin_acc_flag:
-                linacc_imag_fc = Flatten()(linacc_imag)
-                linacc_imag_fc = Dense(1, activation='sigmoid')(linacc_imag_fc)
+        branches[name] = sensor_branch(sensors[name], kernel_size=(3, 3, 2) if name == 'gps' else (3, 3, 3), trainable=not freeze)
 
-                model_linacc_imag = Model(x, linacc_imag_fc)
-                model_linacc_imag.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_linacc_imag)))
+        if stacking:
+            sensor_fc = Flatten()(branches[name])
+            sensor_fc = Dense(1)(sensor_fc)
+            sensor_fc = Activation('sigmoid', dtype='float32')(sensor_fc)
 
-        gps_fc = Flatten()(gps)
-        gps_fc = Dense(1, activation='sigmoid')(gps_fc)
+            model_sub = Model(x, sensor_fc)
+            model_sub.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpts[name]))).assert_existing_objects_matched()
 
-        model_gps = Model(x, gps_fc)
-        model_gps.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_gps)))
+    # real and imaginary part of a sensor are neighbours on the branch axis
+    order = [name for name in channels if not name.endswith('_imag') and name != 'gps']
+    order = [part for name in order for part in (name, name + '_imag') if part in branches] + ['gps']
+    sensor = tf.stack([branches[name] for name in order], 3)
 
-    if lin_acc_flag:
-        if fourier_transform_flag:
-            sensor = tf.concat([acc_real, acc_imag, gyro_real, gyro_imag, linacc_real, linacc_imag, gps], 3)
-        else:
-            sensor = tf.concat([acc_real, gyro_real, linacc_real, gps], 3)
-    else:
-        if fourier_transform_flag:
-            sensor = tf.concat([acc_real, acc_imag, gyro_real, gyro_imag, gps], 3)
-        else:
-            sensor = tf.concat([acc_real, gyro_real, gps], 3)
+    # merge the branch axis into the slice axis, the dilation keeps the 3x3 kernels from mixing neighbouring branches
+    num_branches = len(branches)
+    sensor = Reshape((input_shape[1] - 2, (input_shape[2] - 2) * num_branches, 64))(sensor)
 
     sensor = Dropout(0.5)(sensor)
 
-    sensor_conv1 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor)
-    sensor_conv1 = BatchNormalization()(sensor_conv1)
+    sensor_conv1 = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor)
+    sensor_conv1 = BatchNormalization(axis=-1)(sensor_conv1)
     sensor_conv1 = ReLU()(sensor_conv1)
     sensor_conv1 = Dropout(0.5)(sensor_conv1)
 
-    sensor_conv2 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor_conv1)
-    sensor_conv2 = BatchNormalization()(sensor_conv2)
+    sensor_conv2 = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor_conv1)
+    sensor_conv2 = BatchNormalization(axis=-1)(sensor_conv2)
     sensor_conv2 = ReLU()(sensor_conv2)
     sensor_conv2 = Dropout(0.5)(sensor_conv2)
 
-    sensor_conv3 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor_conv2)
-    sensor_conv3 = BatchNormalization()(sensor_conv3)
+    sensor_conv3 = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor_conv2)
+    sensor_conv3 = BatchNormalization(axis=-1)(sensor_conv3)
     sensor_conv3 = ReLU()(sensor_conv3)
     sensor_conv3 = Dropout(0.5)(sensor_conv3)
 
-    sensor_conv4 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor_conv3)
-    sensor_conv4 = BatchNormalization()(sensor_conv4)
+    sensor_conv4 = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor_conv3)
+    sensor_conv4 = BatchNormalization(axis=-1)(sensor_conv4)
     sensor_conv4 = ReLU()(sensor_conv4)
 
-    sensor_conv5 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor_conv4)
-    sensor_conv5 = BatchNormalization()(sensor_conv5)
+    sensor_conv5 = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor_conv4)
+    sensor_conv5 = BatchNormalization(axis=-1)(sensor_conv5)
     sensor_conv5 = ReLU()(sensor_conv5)
 
-    sensor_conv6 = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor_conv5)
-    sensor_conv6 = BatchNormalization()(sensor_conv6)
+    sensor_conv6 = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor_conv5)
+    sensor_conv6 = BatchNormalization(axis=-1)(sensor_conv6)
     sensor_conv6 = ReLU()(sensor_conv6)
 
-    sensor_shortcut = Conv3D(64, kernel_size=(3, 3, 1), padding='same')(sensor)
-    sensor_shortcut = BatchNormalization()(sensor_shortcut)
+    sensor_shortcut = Conv2D(64, kernel_size=(3, 3), padding='same', dilation_rate=(1, num_branches), data_format='channels_last')(sensor)
+    sensor_shortcut = BatchNormalization(axis=-1)(sensor_shortcut)
     sensor_shortcut = ReLU()(sensor_shortcut)
     sensor_shortcut = Dropout(0.5)(sensor_shortcut)
 
     sensor = add([sensor_conv6, sensor_shortcut])
 
-    sensor = tf.transpose(sensor, perm=(0, 2, 1, 3, 4))
-
-    sensor = Reshape((input_shape[2] - 2, (input_shape[1] - 2) * ((2 + lin_acc_flag) * (fourier_transform_flag + 1) + 1) * 64))(sensor)
+    # the buckets are loaded with the slices first, so the gru time axis is already axis 1 and no transpose is needed
+    sensor = Reshape((input_shape[1] - 2, (input_shape[2] - 2) * num_branches * 64))(sensor)
 
-    sensor_gru1 = GRUCell(120, dropout=0.5, activation=None)
-    sensor_gru2 = GRUCell(120, dropout=0.5, activation=None)
-    sensor = RNN(StackedRNNCells([sensor_gru1, sensor_gru2]), return_sequences=True)(sensor)
+    # default activations and no recurrent dropout keep the gru layers on the fused cudnn kernel
+    sensor = GRU(120, dropout=0.5, return_sequences=True)(sensor)
+    sensor = GRU(120, dropout=0.5, return_sequences=True)(sensor)
 
     sensor = tf.math.reduce_mean(sensor, axis=1, keepdims=False)
 
-    sensor = Dense(1, activation='sigmoid', bias_initializer=output_bias)(sensor)
+    sensor = Dense(1, bias_initializer=output_bias)(sensor)
+    sensor = Activation('sigmoid', dtype='float32')(sensor)
 
     model = Model(x, sensor)
 
     return model
 
 
-def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1, input_shape=(None, 5, 20, 14),
-                    fourier_transform_flag=True, lin_acc_flag=False,
+def fold_batch_norm(model, sample=None, atol=1e-2):
+    '''
+    Fold the batch normalization layers into their preceding convolution for inference. The folded model computes in float32.
+    @param model: trained model
+    @param sample: batch of buckets to check the folded model against the trained model, no check if None
+    @param atol: absolute tolerance of the check, loose enough for a model trained in mixed float16 precision
+    @return: model without batch normalization layers which yields the same inference results
+    '''
+    folded_weights = {}
+
+    for layer in model.layers:
+        if not isinstance(layer, BatchNormalization):
+            continue
+        # inbound_layers is a list for layers with more than one input, those are never a conv
+        conv = layer._inbound_nodes[0].inbound_layers
+        if isinstance(conv, list):
+            if len(conv) != 1:
+                continue
+            conv = conv[0]
+        # the conv output must reach the batch normalization unchanged, so no activation and no other consumer
+        if not isinstance(conv, (Conv2D, Conv3D)) or conv.get_config()['activation'] != 'linear' \
+                or not conv.use_bias or len(conv._outbound_nodes) != 1:
+            continue
+        gamma, beta, moving_mean, moving_variance = layer.get_weights()
+        kernel, bias = conv.get_weights()
+        scale = gamma / np.sqrt(moving_variance + layer.epsilon)
+        folded_weights[conv.name] = [kernel * scale, (bias - moving_mean) * scale + beta]
+        folded_weights[layer.name] = []
+
+    def clone_layer(layer):
+        if folded_weights.get(layer.name) == []:
+            # the folded batch normalization is replaced by the identity
+            return Activation('linear', name=layer.name, dtype='float32')
+        config = layer.get_config()
+        config['dtype'] = 'float32'
+        return layer.__class__.from_config(config)
+
+    folded_model = tf.keras.models.clone_model(model, clone_function=clone_layer)
+
+    for layer in model.layers:
+        weights = folded_weights[layer.name] if layer.name in folded_weights else layer.get_weights()
+        folded_model.get_layer(layer.name).set_weights(weights)
+
+    if sample is not None:
+        expected = model.predict(sample, verbose=0)
+        folded = folded_model.predict(sample, verbose=0)
+        if not np.allclose(expected, folded, atol=atol):
+            raise ValueError('folded model deviates from the trained model by {}'.format(np.max(np.abs(expected - folded))))
+
+    return folded_model
+
+
+def export_tflite(model, representative_ds, tflite_file, num_calibration_batches=100):
+    '''
+    Export the model as tflite model with int8 quantized weights and activations for inference on mobile devices.
+    The model input and output stay float32, the converter quantizes the buckets on entry and dequantizes the
+    probabilities on exit. Ops without an int8 kernel, like the recurrent loop of the gru head, run in float32.
+    @param model: trained model
+    @param representative_ds: dataset used to calibrate the activation ranges
+    @param tflite_file: path to the tflite file
+    @param num_calibration_batches: number of batches used for the calibration
+    '''
+    def representative_dataset():
+        for x, _ in representative_ds.take(num_calibration_batches):
+            yield [tf.cast(x, tf.float32)]
+
+    sample = next(iter(representative_ds.take(1)))[0]
+    converter = tf.lite.TFLiteConverter.from_keras_model(fold_batch_norm(model, sample=tf.cast(sample, tf.float32)))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    # the float builtins are only used by ops without int8 kernel, tflite has no bfloat16 kernels for the boundary layers
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+    converter.inference_input_type = tf.float32
+    converter.inference_output_type = tf.float32
+    tflite_model = converter.convert()
+
+    if os.path.dirname(tflite_file):
+        os.makedirs(os.path.dirname(tflite_file), exist_ok=True)
+
+    with open(tflite_file, 'wb') as f:
+        f.write(tflite_model)
+
+
+def export_saved_model(model, input_shape, export_dir):
+    '''
+    Export the model as saved model whose serving function is traced once for the fixed bucket shape.
+    @param model: trained model
+    @param input_shape: bucket shape
+    @param export_dir: path to the saved model directory
+    '''
+    # only the batch size is left dynamic, so serving never retraces and sees static shapes for every op
+    @tf.function(input_signature=[tf.TensorSpec(shape=(None, input_shape[1], input_shape[2], input_shape[3]), dtype=tf.float32)])
+    def serving_function(x):
+        return model(x, training=False)
+
+    tf.saved_model.save(model, export_dir, signatures={'serving_default': serving_function})
+
+
+def set_mixed_precision_policy(mixed_precision_flag=True):
+    '''
+    Set the mixed float16 precision policy for the models built afterwards if a gpu is available.
+    @param mixed_precision_flag: whether to use mixed float16 precision on gpu
+    @return: previous global policy, which is restored once training is done
+    '''
+    previous_policy = tf.keras.mixed_precision.global_policy()
+
+    if mixed_precision_flag and tf.config.list_physical_devices('GPU'):
+        # float16 activations let cuDNN dispatch the channels last tensor core kernels
+        tf.keras.mixed_precision.set_global_policy('mixed_float16')
+
+    return previous_policy
+
+
+def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1, input_shape=(None, 20, 5, 14),
+                    fourier_transform_flag=True, lin_acc_flag=False, mixed_precision_flag=True, xla_flag=True,
                     ckpt_cyclesense_acc='checkpoints/cyclesense_sub_acc/training',
                     ckpt_cyclesense_acc_imag='checkpoints/cyclesense_sub_acc_imag/training',
                     ckpt_cyclesense_gyro='checkpoints/cyclesense_sub_gyro/training',
@@ -688,6 +358,8 @@ def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pati
     @param input_shape: bucket shape
     @param fourier_transform_flag: whether fourier transform was applied on the data
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param mixed_precision_flag: whether to use mixed float16 precision on gpu
+    @param xla_flag: whether to let xla fuse the conv, batch normalization and relu kernels of the submodels
     @param ckpt_cyclesense_acc: checkpoint path cyclesense accelerometer submodel
     @param ckpt_cyclesense_acc_imag: checkpoint path cyclesense accelerometer imaginary submodel
     @param ckpt_cyclesense_gyro: checkpoint path cyclesense gyroscope submodel
@@ -696,9 +368,10 @@ def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pati
     @param ckpt_cyclesense_linacc_imag: checkpoint path cyclesense linacc imaginary submodel
     @param ckpt_cyclesense_gps: checkpoint path cyclesense gps submodel
     '''
+    previous_policy = set_mixed_precision_policy(mixed_precision_flag)
+
     initial_bias = np.log(class_weight[0] / class_weight[1])
-    optimizer = tf.keras.optimizers.Adam(learning_rate=0.0001)
-    loss = tf.keras.losses.BinaryCrossentropy(from_logits=False),
+    loss = tf.keras.losses.BinaryCrossentropy(from_logits=False)
 
     # Create a callback for early stopping
     es_callback = tf.keras.callbacks.EarlyStopping(
@@ -708,24 +381,20 @@ def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pati
         mode='max',
         restore_best_weights=True)
 
-    if lin_acc_flag:
-        submodels = [(submodel_acc(input_shape, initial_bias), ckpt_cyclesense_acc),
-                     (submodel_acc_imag(input_shape, initial_bias, lin_acc_flag), ckpt_cyclesense_acc_imag),
-                     (submodel_gyro(input_shape, initial_bias), ckpt_cyclesense_gyro),
-                     (submodel_gyro_imag(input_shape, initial_bias, lin_acc_flag), ckpt_cyclesense_gyro_imag),
-                     (submodel_linacc(input_shape, initial_bias), ckpt_cyclesense_linacc),
-                     (submodel_linacc_imag(input_shape, initial_bias), ckpt_cyclesense_linacc_imag),
-                     (submodel_gps(input_shape, initial_bias, fourier_transform_flag, lin_acc_flag), ckpt_cyclesense_gps)]
+    ckpts = {'acc': ckpt_cyclesense_acc, 'acc_imag': ckpt_cyclesense_acc_imag, 'gyro': ckpt_cyclesense_gyro,
+             'gyro_imag': ckpt_cyclesense_gyro_imag, 'linacc': ckpt_cyclesense_linacc,
+             'linacc_imag': ckpt_cyclesense_linacc_imag, 'gps': ckpt_cyclesense_gps}
 
-    else:
-        submodels = [(submodel_acc(input_shape, initial_bias), ckpt_cyclesense_acc),
-                     (submodel_acc_imag(input_shape, initial_bias, lin_acc_flag), ckpt_cyclesense_acc_imag),
-                     (submodel_gyro(input_shape, initial_bias), ckpt_cyclesense_gyro),
-                     (submodel_gyro_imag(input_shape, initial_bias, lin_acc_flag), ckpt_cyclesense_gyro_imag),
-                     (submodel_gps(input_shape, initial_bias, fourier_transform_flag, lin_acc_flag), ckpt_cyclesense_gps)]
+    # the submodels are only built right before their training, so just one of them is kept on the device at a time
+    submodels = [(partial(submodel, input_shape, initial_bias, channels, (3, 3, 2) if name == 'gps' else (3, 3, 3)), ckpts[name])
+                 for name, channels in sensor_channels(fourier_transform_flag, lin_acc_flag).items()]
 
+    for build_submodel, ckpt_cyclesense_sub in submodels:
 
-    for model, ckpt_cyclesense_sub in submodels:
+        tf.keras.backend.clear_session()
+        model = build_submodel()
+        # every submodel gets its own optimizer, the adam slots are bound to the variables of one model
+        optimizer = tf.keras.optimizers.Adam(learning_rate=0.0001)
 
         metrics = ['accuracy',
                    tf.keras.metrics.TrueNegatives(name='tn'),
@@ -734,7 +403,8 @@ def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pati
                    tf.keras.metrics.TruePositives(name='tp'),
                    tf.keras.metrics.AUC(curve='roc', from_logits=False, name='aucroc')]
 
-        model.compile(optimizer=optimizer, loss=loss, metrics=metrics)
+        # the submodels are pure conv stacks, xla fuses the batch normalization and relu epilogues into the conv kernels
+        model.compile(optimizer=optimizer, loss=loss, metrics=metrics, jit_compile=xla_flag)
 
         try:
             model.load_weights(tf.train.latest_checkpoint(os.path.dirname(ckpt_cyclesense_sub)))
@@ -749,7 +419,8 @@ def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pati
             save_best_only=True,
             mode='max',
             save_weights_only=True,
-            save_freq='epoch')
+            save_freq='epoch',
+            options=HOST_CHECKPOINT_OPTIONS)
 
         # Define the Keras TensorBoard callback.
         tb_logdir = 'tb_logs/fit/' + datetime.now().strftime('%Y%m%d-%H%M%S')
@@ -758,9 +429,13 @@ def train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pati
         model.fit(train_ds, validation_data=val_ds, epochs=num_epochs, callbacks=[cp_callback, es_callback, tensorboard_callback],
                   class_weight=class_weight)
 
+    # models built later in the process do not inherit the training policy
+    tf.keras.mixed_precision.set_global_policy(previous_policy)
+
 
-def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1, input_shape=(None, 5, 20, 14),
-                    stacking=False, freeze=False, fourier_transform_flag=True, lin_acc_flag=False,
+def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1, input_shape=(None, 20, 5, 14),
+                    stacking=False, freeze=False, fourier_transform_flag=True, lin_acc_flag=False, mixed_precision_flag=True,
+                    share_imu_weights=False, tflite_file=None, export_dir=None,
                     ckpt_cyclesense='checkpoints/cyclesense/training',
                     ckpt_cyclesense_acc='checkpoints/cyclesense_sub_acc/training',
                     ckpt_cyclesense_acc_imag='checkpoints/cyclesense_sub_acc_imag/training',
@@ -782,6 +457,10 @@ def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pat
     @param freeze: whether to freeze the submodel weights
     @param fourier_transform_flag: whether fourier transform was applied on the data
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param mixed_precision_flag: whether to use mixed float16 precision on gpu
+    @param share_imu_weights: whether the accelerometer and gyroscope branches share their convolution weights
+    @param tflite_file: path to export the int8 quantized tflite model to, no export if None
+    @param export_dir: path to export the saved model to, no export if None
     @param ckpt_cyclesense: checkpoint path cyclesense model
     @param ckpt_cyclesense_acc: checkpoint path cyclesense accelerometer submodel
     @param ckpt_cyclesense_acc_imag: checkpoint path cyclesense accelerometer imaginary submodel
@@ -791,11 +470,13 @@ def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pat
     @param ckpt_cyclesense_linacc_imag: checkpoint path cyclesense linacc imaginary submodel
     @param ckpt_cyclesense_gps: checkpoint path cyclesense gps submodel
     '''
+    previous_policy = set_mixed_precision_policy(mixed_precision_flag)
+
     initial_bias = np.log(class_weight[0] / class_weight[1])
 
     model = cyclesense_model(input_shape, initial_bias, stacking=stacking, freeze=freeze,
                             fourier_transform_flag=fourier_transform_flag, lin_acc_flag=lin_acc_flag,
-                            ckpt_cyclesense_acc=ckpt_cyclesense_acc,
+                            share_imu_weights=share_imu_weights, ckpt_cyclesense_acc=ckpt_cyclesense_acc,
                             ckpt_cyclesense_acc_imag=ckpt_cyclesense_acc_imag, ckpt_cyclesense_gyro=ckpt_cyclesense_gyro,
                             ckpt_cyclesense_gyro_imag=ckpt_cyclesense_gyro_imag, ckpt_cyclesense_linacc=ckpt_cyclesense_linacc,
                             ckpt_cyclesense_linacc_imag=ckpt_cyclesense_linacc_imag, ckpt_cyclesense_gps=ckpt_cyclesense_gps)
@@ -810,6 +491,7 @@ def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pat
                TSS(), tf.keras.metrics.SensitivityAtSpecificity(0.96, name='sas')
                ]
 
+    # no jit_compile here, xla cannot lower the cudnn gru kernels and would fall back to the slow generic loop
     model.compile(optimizer=optimizer, loss=loss, metrics=metrics)
 
     try:
@@ -825,7 +507,8 @@ def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pat
         save_best_only=True,
         mode='max',
         save_weights_only=True,
-        save_freq='epoch')
+        save_freq='epoch',
+        options=HOST_CHECKPOINT_OPTIONS)
 
     # Create a callback for early stopping
     es_callback = tf.keras.callbacks.EarlyStopping(
@@ -847,18 +530,20 @@ def train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=10, pat
     print('Model evaluation on val set:')
     model.evaluate(val_ds)
     print('Model evaluation on test set:')
-    model.evaluate(test_ds)
+    test_results = model.evaluate(test_ds, return_dict=True)
 
-    y_pred = model.predict(test_ds)
+    print_test_scores(test_results)
 
-    y_true = np.concatenate([y for x, y in test_ds], axis=0)
+    model.summary()
 
-    y_pred = np.round(y_pred)[:, 0]
+    # the exporters and models built later in the process do not inherit the training policy
+    tf.keras.mixed_precision.set_global_policy(previous_policy)
 
-    print('Confusion matrix:')
-    print(confusion_matrix(y_true, y_pred))
+    if tflite_file is not None:
+        export_tflite(model, train_ds, tflite_file)
 
-    model.summary()
+    if export_dir is not None:
+        export_saved_model(model, input_shape, export_dir)
 
 
 def main(argv):
@@ -883,18 +568,24 @@ def main(argv):
     parser.add_argument('--fourier_transform_flag', metavar='<bool>', type=bool, help='whether fourier transform was applied on the data', required=False, default=True)
     parser.add_argument('--stacking', metavar='<bool>', type=bool, help='whether to train with stracking', required=False, default=True)
     parser.add_argument('--freeze', metavar='<bool>', type=bool, help='whether to freeze the submodel weights', required=False, default=True)
+    parser.add_argument('--mixed_precision_flag', metavar='<bool>', type=bool, help='whether to use mixed float16 precision on gpu', required=False, default=True)
+    parser.add_argument('--xla_flag', metavar='<bool>', type=bool, help='whether to let xla fuse the conv, batch normalization and relu kernels of the submodels', required=False, default=True)
+    parser.add_argument('--share_imu_weights', metavar='<bool>', type=bool, help='whether the accelerometer and gyroscope branches share their convolution weights', required=False, default=False)
+    parser.add_argument('--tflite_file', metavar='<file>', type=str, help='path to export the int8 quantized tflite model to', required=False, default=None)
+    parser.add_argument('--export_dir', metavar='<directory>', type=str, help='path to export the saved model to', required=False, default=None)
     parser.add_argument('--class_counts_file', metavar='<file>', type=str, help='path to class counts file', required=False, default='class_counts.csv')
     parser.add_argument('--cache_dir', metavar='<directory>', type=str, help='path to cache directory', required=False, default=None)
     args = parser.parse_args()
 
-    input_shape = (None, args.window_size, args.slices, 2 + 6 * (1 + args.fourier_transform_flag) + 3 * (1 + args.fourier_transform_flag) * args.lin_acc_flag)
+    input_shape = (None, args.slices, args.window_size, 2 + 6 * (1 + args.fourier_transform_flag) + 3 * (1 + args.fourier_transform_flag) * args.lin_acc_flag)
 
     train_ds, val_ds, test_ds, class_weight = load_data(args.dir, args.region, input_shape=input_shape, batch_size=args.batch_size,
-                                                        in_memory_flag=args.in_memory_flag, transpose_flag=False,
+                                                        in_memory_flag=args.in_memory_flag, transpose_flag=True,
                                                         class_counts_file=args.class_counts_file, cache_dir=args.cache_dir)
 
     train_submodels(train_ds, val_ds, test_ds, class_weight, num_epochs=args.num_epochs, patience=args.patience,
                     input_shape=input_shape, fourier_transform_flag=args.fourier_transform_flag, lin_acc_flag=args.lin_acc_flag,
+                    mixed_precision_flag=args.mixed_precision_flag, xla_flag=args.xla_flag,
                     ckpt_cyclesense_acc=args.ckpt_cyclesense_acc, ckpt_cyclesense_acc_imag=args.ckpt_cyclesense_acc_imag,
                     ckpt_cyclesense_gyro=args.ckpt_cyclesense_gyro, ckpt_cyclesense_gyro_imag=args.ckpt_cyclesense_gyro_imag,
                     ckpt_cyclesense_linacc=args.ckpt_cyclesense_linacc, ckpt_cyclesense_linacc_imag=args.ckpt_cyclesense_linacc_imag,
@@ -903,6 +594,8 @@ def main(argv):
     train_cyclesense(train_ds, val_ds, test_ds, class_weight, num_epochs=args.num_epochs, patience=args.patience,
                     input_shape=input_shape, stacking=args.stacking, freeze=args.freeze,
                     fourier_transform_flag=args.fourier_transform_flag, lin_acc_flag=args.lin_acc_flag,
+                    mixed_precision_flag=args.mixed_precision_flag,
+                    share_imu_weights=args.share_imu_weights, tflite_file=args.tflite_file, export_dir=args.export_dir,
                     ckpt_cyclesense=args.ckpt_cyclesense, ckpt_cyclesense_acc=args.ckpt_cyclesense_acc,
                     ckpt_cyclesense_acc_imag=args.ckpt_cyclesense_acc_imag, ckpt_cyclesense_gyro=args.ckpt_cyclesense_gyro,
                     ckpt_cyclesense_gyro_imag=args.ckpt_cyclesense_gyro_imag, ckpt_cyclesense_linacc=args.ckpt_cyclesense_linacc,
@@ -2,19 +2,74 @@ import os
 import sys
 import argparse as arg
 import logging
-import numpy as np
 from datetime import datetime
 import tensorflow as tf
 from tensorflow.keras.layers import Reshape
-from sklearn.metrics import confusion_matrix
 
 from data_loader import load_data
-from metrics import TSS
-from tensorflow_addons.layers import ESN
+from metrics import TSS, print_test_scores
 
 tf.get_logger().setLevel(logging.ERROR)
 
 
+@tf.function(jit_compile=True)
+def reservoir_scan(inputs, kernel, recurrent_kernel, bias, leaky):
+    '''
+    Run the reservoir over the whole sequence as a single xla compiled scan.
+    @param inputs: sequences of shape (batch, time, features)
+    @param kernel: input weights
+    @param recurrent_kernel: reservoir weights
+    @param bias: reservoir bias
+    @param leaky: leaking rate of the reservoir state
+    @return: last reservoir state
+    '''
+    # the input projection does not depend on the state, so it is computed for all time steps at once
+    projected_inputs = tf.einsum('btf,fu->tbu', inputs, kernel) + bias
+
+    def step(state, projected_input):
+        return (1 - leaky) * state + leaky * tf.tanh(projected_input + tf.matmul(state, recurrent_kernel))
+
+    initial_state = tf.zeros((tf.shape(inputs)[0], tf.shape(kernel)[1]), dtype=inputs.dtype)
+    states = tf.scan(step, projected_inputs, initializer=initial_state)
+
+    return states[-1]
+
+
+class Reservoir(tf.keras.layers.Layer):
+    '''
+    Echo state network layer with fixed random input and reservoir weights.
+    '''
+    def __init__(self, units, connectivity=0.1, leaky=1.0, spectral_radius=0.9, **kwargs):
+        super().__init__(**kwargs)
+        self.units = units
+        self.connectivity = connectivity
+        self.leaky = leaky
+        self.spectral_radius = spectral_radius
+
+    def build(self, input_shape):
+        self.kernel = self.add_weight('kernel', shape=(input_shape[-1], self.units),
+                                      initializer='glorot_uniform', trainable=False)
+        self.recurrent_kernel = self.add_weight('recurrent_kernel', shape=(self.units, self.units),
+                                                initializer=self.recurrent_initializer, trainable=False)
+        self.bias = self.add_weight('bias', shape=(self.units,), initializer='zeros', trainable=False)
+
+    def recurrent_initializer(self, shape, dtype=None):
+        # sparse random reservoir scaled to the target spectral radius for the echo state property
+        weights = tf.keras.initializers.GlorotUniform()(shape, dtype=dtype)
+        weights = tf.where(tf.random.uniform(shape) < self.connectivity, weights, tf.zeros_like(weights))
+        radius = tf.reduce_max(tf.abs(tf.linalg.eigvals(weights)))
+        return weights * tf.cast(self.spectral_radius / tf.maximum(radius, 1e-8), weights.dtype)
+
+    def call(self, inputs):
+        return reservoir_scan(inputs, self.kernel, self.recurrent_kernel, self.bias, self.leaky)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'units': self.units, 'connectivity': self.connectivity, 'leaky': self.leaky,
+                       'spectral_radius': self.spectral_radius})
+        return config
+
+
 class ESN_Model(tf.keras.models.Sequential):
     '''
    Definition of the esn model.
@@ -22,9 +77,10 @@ class ESN_Model(tf.keras.models.Sequential):
     def __init__(self):
         super().__init__()
 
-    def create_model(self):
-        self.add(Reshape((100, 8)))
-        self.add(ESN(100))
+    def create_model(self, num_features=8):
+        # flatten the bucket into one sequence of sensor readings, its length follows from the bucket shape
+        self.add(Reshape((-1, num_features)))
+        self.add(Reservoir(100))
         self.add(tf.keras.layers.Dense(1, activation='sigmoid'))
 
 
@@ -90,16 +146,9 @@ def train(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1,
     print('Model evaluation on val set:')
     model.evaluate(val_ds)
     print('Model evaluation on test set:')
-    model.evaluate(test_ds)
-
-    y_pred = model.predict(test_ds)
-
-    y_true = np.concatenate([y for x, y in test_ds], axis=0)
-
-    y_pred = np.round(y_pred)[:, 0]
+    test_results = model.evaluate(test_ds, return_dict=True)
 
-    print('Confusion matrix:')
-    print(confusion_matrix(y_true, y_pred))
+    print_test_scores(test_results)
 
     model.summary()
 
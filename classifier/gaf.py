@@ -2,14 +2,12 @@ import os
 import sys
 import argparse as arg
 import logging
-import numpy as np
 from datetime import datetime
 import tensorflow as tf
 from tensorflow.keras.layers import Dense, Flatten, Conv2D
-from sklearn.metrics import confusion_matrix
 
 from data_loader import load_data
-from metrics import TSS
+from metrics import TSS, print_test_scores
 
 tf.get_logger().setLevel(logging.ERROR)
 
@@ -91,16 +89,9 @@ def train(train_ds, val_ds, test_ds, class_weight, num_epochs=10, patience=1,
     print('Model evaluation on val set:')
     model.evaluate(val_ds)
     print('Model evaluation on test set:')
-    model.evaluate(test_ds)
+    test_results = model.evaluate(test_ds, return_dict=True)
 
-    y_pred = model.predict(test_ds)
-
-    y_true = np.concatenate([y for x, y in test_ds], axis=0)
-
-    y_pred = np.round(y_pred)[:, 0]
-
-    print('Confusion matrix:')
-    print(confusion_matrix(y_true, y_pred))
+    print_test_scores(test_results)
 
     model.summary()
 
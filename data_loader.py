@@ -9,6 +9,9 @@ from pyts.image import GramianAngularField
 
 input_shape_global = None
 
+# key of the off memory .npz entry that holds all GAN generated buckets stacked into one array
+GENERATED_BATCH_KEY = '_generated_batch'
+
 
 def set_input_shape_global(input_shape):
     global input_shape_global
@@ -44,14 +47,18 @@ def data_gen(dir, split, region, deterministic=True, transpose_flag=False, gaf_f
     """
     with np.load(os.path.join(dir, split, region)) as data:
 
-        if deterministic:
-            files = data.files
-        else:
-            files = np.random.choice(data.files, size=len(data.files), replace=False)
+        # generated buckets are stored stacked under one key and are yielded one by one like the bucket files
+        files = [file for file in data.files if file != GENERATED_BATCH_KEY]
+        generated_batch = data[GENERATED_BATCH_KEY] if GENERATED_BATCH_KEY in data.files else []
+        samples = [(file, None) for file in files] + [(None, i) for i in range(len(generated_batch))]
+
+        if not deterministic:
+            samples = [samples[i] for i in np.random.permutation(len(samples))]
 
-        for file in files:
-            y = tf.cast(data[file][:, :, -1], tf.dtypes.int32)
-            x = data[file][:, :, :-1]
+        for file, generated_index in samples:
+            bucket = data[file] if file is not None else generated_batch[generated_index]
+            y = tf.cast(bucket[:, :, -1], tf.dtypes.int32)
+            x = bucket[:, :, :-1]
             y = tf.math.reduce_mean(y, axis=0)
             y = tf.math.reduce_mean(y, axis=0)
 
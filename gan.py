@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import tensorflow as tf
 from tqdm.auto import trange
 
@@ -114,3 +115,29 @@ def train_gan(dataset, epochs):
     discriminator.save_weights(disc_checkpoint)
 
     return generator, discriminator
+
+
+def generate_buckets(generator, num_examples, latent_dim, batch_size=4096):
+    '''
+    Method to generate incident buckets with the trained generator.
+    @param generator: trained generator
+    @param num_examples: number of buckets to generate
+    @param latent_dim: noise input dimensionality GAN
+    @param batch_size: number of buckets generated per generator call, bounds the memory of the latent and generated tensors
+    @return: float32 array of shape (num_examples, window_size, slices, features + 1) whose last channel is the incident label, always 1
+    '''
+    # generate in fixed size batches, so the latent and generated tensors never hold all examples at once
+    @tf.function(input_signature=[tf.TensorSpec([None, latent_dim], tf.float32)])
+    def generate_step(latent):
+        return generator(latent, training=False)
+
+    buckets = np.empty((num_examples,) + tuple(generator.output_shape[1:-1]) + (generator.output_shape[-1] + 1,), dtype=np.float32)
+
+    # the generated buckets are all incidents, so the label channel is set once instead of concatenated per batch
+    buckets[:, :, :, -1] = 1
+
+    for start in range(0, num_examples, batch_size):
+        size = min(batch_size, num_examples - start)
+        buckets[start:start + size, :, :, :-1] = generate_step(tf.random.normal([size, latent_dim])).numpy()
+
+    return buckets
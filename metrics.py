@@ -5,6 +5,10 @@ from keras.utils import metrics_utils
 from keras.utils.generic_utils import to_list
 
 
+# checkpoints are written through the host so saving does not block the training device
+HOST_CHECKPOINT_OPTIONS = tf.train.CheckpointOptions(experimental_io_device='/job:localhost')
+
+
 class TSS(tf.keras.metrics.Metric):
 
     def __init__(self,
@@ -88,3 +92,20 @@ class TSS(tf.keras.metrics.Metric):
         }
         base_config = super(TSS, self).get_config()
         return dict(list(base_config.items()) + list(config.items()))
+
+
+def print_test_scores(test_results):
+    '''
+    Print the confusion matrix, precision, recall and f1 score of a test evaluation.
+    @param test_results: dictionary returned by model.evaluate with the tn, fp, fn and tp counts
+    '''
+    # the confusion matrix and the derived scores follow from the counts of the test evaluation, so the test set is not read again
+    tn, fp, fn, tp = (test_results[key] for key in ('tn', 'fp', 'fn', 'tp'))
+
+    print('Confusion matrix:')
+    print(np.array([[tn, fp], [fn, tp]], dtype=np.int64))
+
+    precision = tp / (tp + fp) if tp + fp > 0 else 0.0
+    recall = tp / (tp + fn) if tp + fn > 0 else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+    print('Precision: {:.4f}, recall: {:.4f}, f1 score: {:.4f}'.format(precision, recall, f1))
@@ -2,129 +2,275 @@ import os
 import logging
 import glob
 import numpy as np
+import scipy.fft
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import tensorflow as tf
-import datetime as dt
 import multiprocessing as mp
 from tqdm.auto import tqdm
 from sklearn.preprocessing import MaxAbsScaler
 from functools import partial
+from contextlib import contextmanager
 import joblib
 import sys
 import warnings
+import zipfile
 import argparse as arg
 tf.get_logger().setLevel(logging.ERROR)
 
-from data_loader import create_ds, set_input_shape_global
-from gan import init_gan, train_gan
+from data_loader import create_ds, set_input_shape_global, GENERATED_BATCH_KEY
+from gan import init_gan, train_gan, generate_buckets
 
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
 
-def sort_timestamps_inner(file):
+try:
+    import cupy
+except ImportError:
+    cupy = None
+
+# .npz file opened by this process, which is closed by close_npz_files at the end of a task
+npz_files = {}
+
+# pyfftw real to complex plans per input shape, precision, axis and thread count, which are reused by all transforms of the same shape
+fft_plans = {}
+fft_wisdom_loaded = False
+
+# 180 degree rotation matrices around the X, Y and Z axis
+ROTATION_MATRICES = np.array([[[1, 0, 0],
+                               [0, -1, 0],
+                               [0, 0, -1]],
+                              [[-1, 0, 0],
+                               [0, 1, 0],
+                               [0, 0, -1]],
+                              [[-1, 0, 0],
+                               [0, -1, 0],
+                               [0, 0, 1]]], dtype=np.float32)
+
+
+@contextmanager
+def pool_or_new(pool=None, start_method=None):
     '''
-    Inner sort_timestamps method for parallelization.
-    @param file: file to preprocess
+    Context manager that yields the given process pool or a new one, which is closed afterwards.
+    @param pool: process pool to reuse
+    @param start_method: multiprocessing start method of a new pool, the platform default if None
+    @return: process pool
+    '''
+    if pool is not None:
+        yield pool
+    else:
+        with mp.get_context(start_method).Pool(mp.cpu_count()) as new_pool:
+            yield new_pool
+
+
+def split_files(files, num_splits):
+    '''
+    Method to split a list of file names into contiguous parts of nearly equal length, without converting it to a numpy string array.
+    @param files: list of file names
+    @param num_splits: number of parts
+    @return: list of file name lists
     '''
-    df = pd.read_csv(file)
-    df.sort_values(['timeStamp'], axis=0, ascending=True, inplace=True, kind='merge')
-    df.to_csv(os.path.join(file), ',', index=False)
+    return [files[i * len(files) // num_splits:(i + 1) * len(files) // num_splits] for i in range(num_splits)]
 
 
-def sort_timestamps(dir, region='Berlin', pbar=None):
+def ride_files(dir, split, region):
     '''
-    Method to sort timestamps data points in ride files by their timestamps as some are not in the correct order.
+    Method to list the ride files of a split, either still as exported csv or as intermediate parquet file.
     @param dir: path to the data directory with the exported files
+    @param split: train, test or val split
     @param region: target region of files that should be preprocessed
-    @param pbar: progress bar
+    @return: list of ride files
     '''
-    for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(sort_timestamps_inner, file_list)
+    return glob.glob(os.path.join(dir, split, region, 'VM2_*.csv')) + glob.glob(os.path.join(dir, split, region, 'VM2_*.parquet'))
 
-    pbar.update(1) if pbar is not None else print()
+
+def read_ride_table(file, columns=None):
+    '''
+    Method to read a csv or parquet ride file as pyarrow table.
+    @param file: ride file
+    @param columns: columns to read, all if None
+    @return: ride table
+    '''
+    if file.endswith('.parquet'):
+        return pq.read_table(file, columns=columns, use_threads=False)
+
+    # the workers already run in parallel, so arrow reads single threaded
+    return pv.read_csv(file, read_options=pv.ReadOptions(use_threads=False), convert_options=pv.ConvertOptions(include_columns=columns or []))
 
 
-def remove_invalid_rides_inner(file):
+def read_ride(file, columns=None):
     '''
-    Inner remove_invalid_rides method for parallelization.
-    @param file: file to preprocess
+    Method to read a csv or parquet ride file as dataframe.
+    @param file: ride file
+    @param columns: columns to read, all if None
+    @return: ride dataframe
     '''
-    df = pd.read_csv(file)
+    if file.endswith('.parquet'):
+        return pd.read_parquet(file, columns=columns)
+
+    return pd.read_csv(file, usecols=columns)
+
 
-    df_cp = df.copy(deep=True)
-    df_cp['timeStamp'] = df_cp['timeStamp'].diff()
+def cast_null_columns(table):
+    '''
+    Method to cast the completely empty csv columns, which are read with null type, to float like pandas does.
+    @param table: ride table
+    @return: ride table without null type columns
+    '''
+    return table.cast(pa.schema([pa.field(field.name, pa.float64()) if pa.types.is_null(field.type) else field for field in table.schema]))
 
-    breakpoints = np.where((df_cp['timeStamp'] > 6000).to_numpy())
 
-    df_cp.dropna(inplace=True, axis=0)
+def write_ride_table(table, file):
+    '''
+    Method to write a ride table as zstd compressed parquet file, which replaces an exported csv ride file.
+    @param table: ride table
+    @param file: ride file the table was read from
+    '''
+    pq.write_table(cast_null_columns(table), os.path.splitext(file)[0] + '.parquet', compression='zstd', compression_level=3)
 
-    if len(df_cp) == 0 or len(breakpoints[0]) > 0:
-        # remove rides where one col is completely empty or timestamp interval is too long
+    if not file.endswith('.parquet'):
         os.remove(file)
 
 
-def remove_invalid_rides(dir, region='Berlin', pbar=None):
+def write_ride(df, file):
     '''
-    Method to remove rides that contain adjacent timestamps that differ by more than 6000 ms as it points at invalid ride files.
-    @param dir: path to the data directory with the exported files
-    @param region: target region of files that should be preprocessed
-    @param pbar: progress bar
+    Method to write a ride dataframe as zstd compressed parquet file, which replaces an exported csv ride file.
+    @param df: ride dataframe
+    @param file: ride file the dataframe was read from
     '''
-    for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
+    write_ride_table(pa.Table.from_pandas(df, preserve_index=False), file)
 
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(remove_invalid_rides_inner, file_list)
 
-    pbar.update(1) if pbar is not None else print()
+def load_npz(path):
+    '''
+    Method to open a .npz file once per process and reuse it as long as the file is not rewritten.
+    @param path: path to the .npz file
+    @return: opened .npz file
+    '''
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+
+    if key not in npz_files:
+        close_npz_files()
+        npz_files[key] = np.load(path)
+
+    return npz_files[key]
+
+
+def close_npz_files():
+    '''
+    Method to close the .npz files opened by load_npz, so that the long-lived pool workers do not keep rewritten or removed files open.
+    '''
+    for npz_file in npz_files.values():
+        npz_file.close()
+    npz_files.clear()
+
+
+def ride_max_abs(df):
+    '''
+    Method to compute the statistics of a ride that the max absolute scaler is fitted on.
+    @param df: ride dataframe without empty values
+    @return: tuple of the maximum absolute value per column and the number of rows
+    '''
+    return df.abs().max(), len(df)
+
+
+def is_android_ride(file):
+    '''
+    Check whether a ride file was recorded on android.
+    @param file: ride file
+    @return: whether the ride was recorded on android
+    '''
+    return os.path.splitext(file)[0][-1] == 'a'
+
+
+def is_invalid_ride(df):
+    '''
+    Check whether one column of a ride is completely empty or its timestamp interval is too long.
+    @param df: ride dataframe sorted by timestamp
+    @return: whether the ride is invalid
+    '''
+    breakpoints = np.diff(df['timeStamp'].to_numpy()) > 6000
+
+    # the first row has no timestamp interval and is therefore never complete
+    complete_rows = df.iloc[1:].notna().all(axis=1)
+
+    return not complete_rows.any() or breakpoints.any()
+
+
+def remove_sensor_values_from_gps_timestamps_df(lin_acc_flag, df):
+    '''
+    Remove the sensor values of the gps measurements of an android ride.
+    @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param df: android ride dataframe
+    @return: ride dataframe without sensor values at the gps timestamps
+    '''
+    gps_rows = df[['lat', 'lon', 'acc']].notna().all(axis=1)
+
+    columns = ['X', 'Y', 'Z', 'a', 'b', 'c']
+    if lin_acc_flag:
+        columns += ['XL', 'YL', 'ZL']
+
+    # nan keeps the sensor columns numeric and is written as an empty value
+    df.loc[gps_rows, columns] = np.nan
+
+    return df
 
 
-def remove_sensor_values_from_gps_timestamps_inner(lin_acc_flag, file):
+def clean_rides_inner(lin_acc_flag, file):
     '''
-    Inner remove_sensor_values_from_gps_timestamps method for parallelization.
+    Inner clean_rides method for parallelization.
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
     @param file: file to preprocess
     '''
+    table = read_ride_table(file)
+    # stable sort like the former merge sort
+    table = table.take(pc.sort_indices(table, sort_keys=[('timeStamp', 'ascending')]))
+    df = cast_null_columns(table).to_pandas()
+
+    if is_invalid_ride(df):
+        # remove rides where one col is completely empty or timestamp interval is too long
+        os.remove(file)
+        return
 
     # for android data remove accelerometer and gyroscope sensor data from gps measurements as timestamps is rounded to seconds and order is not restorable
+    if is_android_ride(file):
+        df = remove_sensor_values_from_gps_timestamps_df(lin_acc_flag, df)
 
-    if os.path.splitext(file)[0][-1] == 'a':
-        df = pd.read_csv(file)
-        df_cp = df.copy(deep=True)
-        df_cp = df_cp[['lat', 'lon', 'acc']].dropna()
-        df_cp = df.iloc[df_cp.index.values].copy(True)
-        df_cp[['X', 'Y', 'Z', 'a', 'b', 'c']] = ''
-        if lin_acc_flag:
-            df_cp[['XL', 'YL', 'ZL']] = ''
-        df.iloc[df_cp.index] = df_cp
-        df.to_csv(file, ',', index=False)
+    write_ride(df, file)
 
 
-def remove_sensor_values_from_gps_timestamps(dir, region='Berlin', lin_acc_flag=False, pbar=None):
+def clean_rides(dir, region='Berlin', lin_acc_flag=False, pbar=None, pool=None):
     '''
-    Method to remove the recorded sensor values that are present when a gps sensor value was recorded as they are often faulty or at least time delayed.
+    Method that sorts the timestamps, removes invalid rides and removes the sensor values from gps timestamps with a single read and write per ride file.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
     @param pbar: progress bar
+    @param pool: process pool to reuse, a new one is created if None
     '''
     for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
+        file_list = ride_files(dir, split, region)
 
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(partial(remove_sensor_values_from_gps_timestamps_inner, lin_acc_flag), file_list)
+        with pool_or_new(pool) as split_pool:
+            split_pool.map(partial(clean_rides_inner, lin_acc_flag), file_list)
 
-    pbar.update(1) if pbar is not None else print()
+    pbar.update(3) if pbar is not None else print()
 
 
-def remove_acc_outliers_inner(lower, upper, file):
+def remove_acc_outliers_df(lower, upper, df):
     '''
-    Inner remove_acc_outliers method for parallelization.
+    Remove the gps measurements with an accuracy outside of the borders.
     @param lower: lower border
     @param upper: upper border
-    @param file: file to preprcess
+    @param df: ride dataframe with a range index
+    @return: ride dataframe without accuracy column
     '''
-    df = pd.read_csv(file)
     arr = df[['acc']].to_numpy()
 
     outliers_lower = arr < lower
@@ -134,144 +280,148 @@ def remove_acc_outliers_inner(lower, upper, file):
     outliers_bool = np.any(outliers, axis=1)
     outlier_rows = np.where(outliers_bool)[0]
     if len(outlier_rows) > 0:
-        # for accuracy outliers, set lat, lon and acc to ''
-        df.loc[outlier_rows, 'lat'] = ''
-        df.loc[outlier_rows, 'lon'] = ''
+        # for accuracy outliers, set lat and lon to nan, which is written as an empty value
+        df.loc[outlier_rows, ['lat', 'lon']] = np.nan
 
     df.drop(columns=['acc'], inplace=True)
-    df.to_csv(file, ',', index=False)
+
+    return df
 
 
-def remove_acc_outliers(dir, region='Berlin', pbar=None):
+def acc_outlier_borders(dir, region='Berlin'):
     '''
-    Method to remove gps accuracy outliers.
+    Method to compute the gps accuracy outlier borders on the train split. Train rides without gps accuracy are removed.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
-    @param pbar: progress bar
+    @return: tuple of lower and upper border
     '''
     l = []
     split = 'train'
 
-    for file in glob.glob(os.path.join(dir, split, region, 'VM2_*.csv')):
-        df = pd.read_csv(file)
+    for file in ride_files(dir, split, region):
+        # only parse the accuracy column
+        acc = read_ride_table(file, ['acc']).column('acc').drop_null()
 
-        df = df[['acc']].dropna()
-
-        if df.shape[0] == 0:
+        if len(acc) == 0:
             os.remove(file)
 
         else:
-            l.append(df[['acc']].to_numpy())
+            l.append(acc.to_numpy())
 
     arr = np.concatenate(l, axis=0)
 
-    arr = arr[:, 0]
-    q25 = np.percentile(arr, 25, axis=0)
-    q75 = np.percentile(arr, 75, axis=0)
+    q25, q75 = np.percentile(arr, [25, 75], axis=0)
 
     iqr = q75 - q25
     cut_off = iqr * 1.5
     lower = q25 - cut_off
     upper = q75 + cut_off
 
-    for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
+    return lower, upper
 
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(partial(remove_acc_outliers_inner, lower, upper), file_list)
 
-    pbar.update(1) if pbar is not None else print()
+def calc_vel_delta_df(df):
+    '''
+    Calculate the "velocity" deltas of a ride.
+    @param df: ride dataframe
+    @return: ride dataframe with lat and lon changes per second
+    '''
+    gps = df[['lat', 'lon', 'timeStamp']].to_numpy(dtype=np.float64)
+    gps_rows = np.flatnonzero(~np.isnan(gps).any(axis=1))
+    gps = gps[gps_rows]
+
+    # compute lat & lon change per second between consecutive gps measurements, all other rows are set to nan
+    vel = np.full((len(df), 2), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vel[gps_rows[1:]] = np.diff(gps[:, :2], axis=0) * 1000 / np.diff(gps[:, 2])[:, np.newaxis]
+
+    df[['lat', 'lon']] = vel
 
+    return df
 
-def calc_vel_delta_inner(file):
+
+def interpolate_time(timestamps, values):
     '''
-    Inner calc_vel_delta method for parallelization.
-    @param file: file to preprocess
+    Linearly interpolate the missing values of a column based on the timestamps. Missing values before the first valid value are kept.
+    @param timestamps: ascending timestamps
+    @param values: column values with missing values as nan
+    @return: interpolated column values
     '''
-    df = pd.read_csv(file)
+    valid = ~np.isnan(values)
 
-    df_cp = df.copy(deep=True)
-    df_cp[['lat', 'lon', 'timeStamp']] = df_cp[['lat', 'lon', 'timeStamp']].dropna().diff()
+    if not np.any(valid):
+        return values
 
-    # compute lat & lon change per second
-    df_cp['lat'] = df_cp['lat'].dropna() * 1000 / df_cp['timeStamp'].dropna()
-    df_cp['lon'] = df_cp['lon'].dropna() * 1000 / df_cp['timeStamp'].dropna()
+    interpolated = np.interp(timestamps, timestamps[valid], values[valid])
+    interpolated[:np.argmax(valid)] = np.nan
 
-    df[['lat', 'lon']] = df_cp[['lat', 'lon']]
+    return interpolated
 
-    df.to_csv(file, ',', index=False)
 
-
-def calc_vel_delta(dir, region='Berlin', pbar=None):
+def backfill(values):
     '''
-    Method to calculate the "velocity" data deltas based on the gps longitude and latitude.
-    @param dir: path to the data directory with the exported files
-    @param region: target region of files that should be preprocessed
-    @param pbar: progress bar
+    Fill the missing values of a column with the next valid value.
+    @param values: column values with missing values as nan
+    @return: backfilled column values
     '''
-    for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(calc_vel_delta_inner, file_list)
+    idx = np.where(~np.isnan(values), np.arange(len(values)), len(values) - 1)
+    idx = np.minimum.accumulate(idx[::-1])[::-1]
 
-    pbar.update(1) if pbar is not None else print()
+    return values[idx]
 
 
-def linear_interpolate(lin_acc_flag, file):
+def interpolate_sensor_values(df, lin_acc_flag=False):
     '''
-    Method to apply linear interpolation on the ride files.
-    @param lin_acc_flag: whether the linear accelerometer data was exported, too
-    @param file: file to preprocess.
+    Linearly interpolate the missing sensor values of a ride based on its datetime index.
+    @param df: ride dataframe with an ascending datetime index
+    @param lin_acc_flag: whether the linear accelerometer values should be interpolated, too
     '''
-    df = pd.read_csv(file)
+    timestamps = df.index.view(np.int64)
+
+    columns = ['X', 'Y', 'Z', 'a', 'b', 'c']
+    if lin_acc_flag:
+        columns += ['XL', 'YL', 'ZL']
 
-    # convert timestamp to datetime format
-    df['timeStamp'] = df['timeStamp'].apply(
-        lambda x: dt.datetime.utcfromtimestamp(x / 1000))
+    for column in columns:
+        df[column] = interpolate_time(timestamps, df[column].to_numpy(dtype=np.float64))
 
-    # set timeStamp col as pandas datetime index
-    df['timeStamp'] = pd.to_datetime(df['timeStamp'], unit='ms')
 
-    df = df.set_index(pd.DatetimeIndex(df['timeStamp']))
+def linear_interpolate_df(lin_acc_flag, android_flag, df):
+    '''
+    Apply linear interpolation on a ride.
+    @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param android_flag: whether the ride was recorded on android
+    @param df: ride dataframe
+    @return: interpolated ride dataframe
+    '''
+    # set unix timestamp in milliseconds as pandas datetime index, the timeStamp col is restored from the index afterwards
+    df.index = pd.to_datetime(df['timeStamp'].to_numpy(), unit='ms')
 
     # drop all duplicate occurrences of the labels and keep the first occurrence
     df = df[~df.index.duplicated(keep='first')]
 
     # interpolation of X, Y, Z, a, b, c via linear interpolation based on timestamp
-    df['X'].interpolate(method='time', inplace=True)
-    df['Y'].interpolate(method='time', inplace=True)
-    df['Z'].interpolate(method='time', inplace=True)
-    df['a'].interpolate(method='time', inplace=True)
-    df['b'].interpolate(method='time', inplace=True)
-    df['c'].interpolate(method='time', inplace=True)
-
-    if os.path.splitext(file)[0][-1] == 'a' and lin_acc_flag:
-        df['XL'].interpolate(method='time', inplace=True)
-        df['YL'].interpolate(method='time', inplace=True)
-        df['ZL'].interpolate(method='time', inplace=True)
-
-    # interpolation of missing values via padding on the reversed df
-    df.sort_index(axis=0, ascending=False, inplace=True)
-    df['lat'].interpolate(method='pad', inplace=True)
-    df['lon'].interpolate(method='pad', inplace=True)
+    interpolate_sensor_values(df, android_flag and lin_acc_flag)
 
-    df.sort_index(axis=0, ascending=True, inplace=True)
+    # interpolation of missing lat & lon via backfill
+    df['lat'] = backfill(df['lat'].to_numpy(dtype=np.float64))
+    df['lon'] = backfill(df['lon'].to_numpy(dtype=np.float64))
 
     # convert timestamp back to unix timestamp format in milliseconds
     df['timeStamp'] = df.index.view(np.int64) // 10 ** 6
 
-    df.to_csv(file, ',', index=False)
+    return df
 
 
-def equidistant_interpolate(time_interval, lin_acc_flag, file):
+def equidistant_interpolate_df(time_interval, lin_acc_flag, android_flag, df):
     '''
-    Method to apply equidistant interpolation on the ride files.
-    @param time_interval: interval between adjacent timestamps (only relevant with equidistant interpolation)
+    Apply equidistant interpolation on a ride.
+    @param time_interval: interval between adjacent timestamps
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
-    @param file: file to preprocess.
+    @param android_flag: whether the ride was recorded on android
+    @param df: ride dataframe
+    @return: interpolated ride dataframe
     '''
-    df = pd.read_csv(file)
-
     # floor start_time so that full seconds are included in the new timestamp series (time_interval may be 50, 100, 125 or 200ms)
     # this ensures that less original data are thrown away after resampling, as GPS measurements are often at full seconds
     start_time = (df['timeStamp'].iloc[0] // time_interval) * time_interval
@@ -281,24 +431,17 @@ def equidistant_interpolate(time_interval, lin_acc_flag, file):
     # new timestamps for equidistant resampling after linear interpolation
     timestamps_new = np.arange(start_time, end_time, time_interval)
     # throw away new timestamps that are already in the original rows
-    timestamps_net_new = list(set(timestamps_new) - set(timestamps_original))
+    timestamps_net_new = np.setdiff1d(timestamps_new, timestamps_original)
 
     # store which original rows to remove later, as they have no equidistant timestamp
-    removables = list(set(timestamps_original) - set(timestamps_new))
-    removables = [dt.datetime.utcfromtimestamp(x / 1000) for x in removables]
+    removables = pd.to_datetime(np.setdiff1d(timestamps_original, timestamps_new), unit='ms')
 
     df_net_new = pd.DataFrame(timestamps_net_new, columns=['timeStamp'])
 
     df = pd.concat([df, df_net_new])
 
-    # convert timestamp to datetime format
-    df['timeStamp'] = df['timeStamp'].apply(
-        lambda x: dt.datetime.utcfromtimestamp(x / 1000))
-
-    # set timeStamp col as pandas datetime index
-    df['timeStamp'] = pd.to_datetime(df['timeStamp'], unit='ms')
-
-    df = df.set_index(pd.DatetimeIndex(df['timeStamp']))
+    # set unix timestamp in milliseconds as pandas datetime index, the timeStamp col is restored from the index afterwards
+    df.index = pd.to_datetime(df['timeStamp'].to_numpy(), unit='ms')
 
     # drop all duplicate occurrences of the labels and keep the first occurrence,
     # as there might be some rides with original rows with duplicate timestamps
@@ -308,40 +451,23 @@ def equidistant_interpolate(time_interval, lin_acc_flag, file):
     df.sort_index(axis=0, ascending=True, inplace=True)
 
     # interpolation of X, Y, Z, a, b, c via linear interpolation based on timestamp
-    df['X'].interpolate(method='time', inplace=True)
-    df['Y'].interpolate(method='time', inplace=True)
-    df['Z'].interpolate(method='time', inplace=True)
-    df['a'].interpolate(method='time', inplace=True)
-    df['b'].interpolate(method='time', inplace=True)
-    df['c'].interpolate(method='time', inplace=True)
-
-    if os.path.splitext(file)[0][-1] == 'a' and lin_acc_flag:
-        df['XL'].interpolate(method='time', inplace=True)
-        df['YL'].interpolate(method='time', inplace=True)
-        df['ZL'].interpolate(method='time', inplace=True)
+    interpolate_sensor_values(df, android_flag and lin_acc_flag)
 
     # interpolation of missing lat & lon via backfill
-    df['lat'].fillna(method='bfill', inplace=True)
-    df['lon'].fillna(method='bfill', inplace=True)
-
-    incident_list = df.loc[df['incident'] > 0]
+    df['lat'] = backfill(df['lat'].to_numpy(dtype=np.float64))
+    df['lon'] = backfill(df['lon'].to_numpy(dtype=np.float64))
 
-    # Assign an incident to the nearest timestamp after equidistant interpolation
-    for i in range(incident_list.shape[0]):
+    incident_timestamps = df.index[df['incident'] > 0].view(np.int64) // 10 ** 6
 
-        found = False
+    # Assign an incident to the nearest equidistant timestamp, ties are resolved towards the later timestamp
+    if len(incident_timestamps) > 0 and len(timestamps_new) > 0:
+        pos = np.searchsorted(timestamps_new, incident_timestamps)
+        left = timestamps_new[np.maximum(pos - 1, 0)]
+        right = timestamps_new[np.minimum(pos, len(timestamps_new) - 1)]
+        nearest = np.where(incident_timestamps - left < right - incident_timestamps, left, right)
 
-        while found != True:
-
-            idx = df.index[df.index.get_indexer([incident_list.iloc[i]['timeStamp']], method='nearest')[0]]
-
-            if idx not in removables:
-                # binary time series classification
-                df.at[idx, 'incident'] = 1.0
-                found = True
-            else:
-                df = df.drop(idx)
-                removables.remove(idx)
+        # binary time series classification
+        df.loc[pd.to_datetime(nearest, unit='ms'), 'incident'] = 1.0
 
     # remove original rows which have no equidistant timestamp
     df = df.drop(removables)
@@ -351,47 +477,64 @@ def equidistant_interpolate(time_interval, lin_acc_flag, file):
 
     df['incident'].fillna(0, inplace=True)
 
-    df.to_csv(file, ',', index=False)
+    return df
 
 
-def interpolate(dir, region='Berlin', time_interval=100, interpolation_type='equidistant', lin_acc_flag=False, pbar=None):
+def resample_rides_inner(lower, upper, time_interval, interpolation_type, lin_acc_flag, file):
     '''
-    Dispatcher method to apply interpolation on the ride files.
+    Inner resample_rides method for parallelization.
+    @param lower: lower gps accuracy border
+    @param upper: upper gps accuracy border
+    @param time_interval: interval between adjacent timestamps (only relevant with equidistant interpolation)
+    @param interpolation_type: whether linear or equidistant interpolation should be used
+    @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param file: file to preprocess
+    '''
+    df = remove_acc_outliers_df(lower, upper, read_ride(file))
+    df = calc_vel_delta_df(df)
+
+    if interpolation_type == 'linear':
+        df = linear_interpolate_df(lin_acc_flag, is_android_ride(file), df)
+    else:
+        df = equidistant_interpolate_df(time_interval, lin_acc_flag, is_android_ride(file), df)
+
+    write_ride(df, file)
+
+
+def resample_rides(dir, region='Berlin', time_interval=100, interpolation_type='equidistant', lin_acc_flag=False, pbar=None, pool=None):
+    '''
+    Method that removes the gps accuracy outliers, calculates the "velocity" deltas and interpolates the ride files with a single read and write per ride file.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
     @param time_interval: interval between adjacent timestamps (only relevant with equidistant interpolation)
     @param interpolation_type: whether linear or equidistant interpolation should be used
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
     @param pbar: progress bar
+    @param pool: process pool to reuse, a new one is created if None
     '''
-    for split in ['train', 'test', 'val']:
-
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
-
-        with mp.Pool(mp.cpu_count()) as pool:
+    if interpolation_type not in ['linear', 'equidistant']:
+        warnings.warn('interpolation_type is incorrect')
+        return
 
-            if interpolation_type == 'linear':
-                pool.map(partial(linear_interpolate, lin_acc_flag), file_list)
+    lower, upper = acc_outlier_borders(dir, region)
 
-            elif interpolation_type == 'equidistant':
-                pool.map(partial(equidistant_interpolate, time_interval, lin_acc_flag), file_list)
+    for split in ['train', 'test', 'val']:
+        file_list = ride_files(dir, split, region)
 
-            else:
-                warnings.warn('interpolation_type is incorrect')
-                return
+        with pool_or_new(pool) as split_pool:
+            split_pool.map(partial(resample_rides_inner, lower, upper, time_interval, interpolation_type, lin_acc_flag), file_list)
 
-    pbar.update(1) if pbar is not None else print()
+    pbar.update(3) if pbar is not None else print()
 
 
-def remove_vel_outliers_inner(lower, upper, file):
+def remove_vel_outliers_df(lower, upper, df):
     '''
-    Inner remove_vel_outliers method for parallelization.
+    Remove the rows with a "velocity" outside of the borders.
     @param lower: lower border
     @param upper: upper border
-    @param file: file to preprcess
+    @param df: ride dataframe with a range index
+    @return: ride dataframe without velocity outliers
     '''
-    df = pd.read_csv(file)
-
     arr = df[['lat', 'lon']].to_numpy()
 
     outliers_lower = arr < lower
@@ -403,30 +546,30 @@ def remove_vel_outliers_inner(lower, upper, file):
 
     if len(outlier_rows) > 0:
         df = df.drop(outlier_rows)
-        df.to_csv(file, ',', index=False)
+
+    return df
 
 
-def remove_vel_outliers(dir, region='Berlin', verbose=3, pbar=None):
+def vel_outlier_borders(dir, region='Berlin', verbose=3):
     '''
-    Method to remove velocity outliers.
+    Method to compute the velocity outlier borders on the train split. Train rides without complete rows are removed.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
     @param verbose: level of information displayed
-    @param pbar: progress bar
+    @return: tuple of lower and upper borders
     '''
     l = []
 
-    for file in glob.glob(os.path.join(dir, 'train', region, 'VM2_*.csv')):
-
-        df = pd.read_csv(file)
+    for file in ride_files(dir, 'train', region):
 
-        df = df.dropna()
+        # all columns are needed to drop the incomplete rows
+        table = read_ride_table(file).drop_null()
 
-        if df.shape[0] == 0:
+        if table.num_rows == 0:
             os.remove(file)
 
         else:
-            l.append(df[['lat', 'lon']].to_numpy())
+            l.append(np.column_stack([table.column('lat').to_numpy(), table.column('lon').to_numpy()]))
 
     arr = np.concatenate(l, axis=0)
 
@@ -434,50 +577,60 @@ def remove_vel_outliers(dir, region='Berlin', verbose=3, pbar=None):
         print('lat lon data max: {}'.format(np.max(arr, axis=0)))
         print('lat lon data min: {}'.format(np.min(arr, axis=0)))
 
-    # arr = arr[:, :]
-    q25 = np.percentile(arr, 25, axis=0)
-    q75 = np.percentile(arr, 75, axis=0)
+    q25, q75 = np.percentile(arr, [25, 75], axis=0)
 
     iqr = q75 - q25
     cut_off = iqr * 3
     lower = q25 - cut_off
     upper = q75 + cut_off
 
-    for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(partial(remove_vel_outliers_inner, lower, upper), file_list)
-
-    pbar.update(1) if pbar is not None else print()
+    return lower, upper
 
 
-def remove_empty_rows_inner(file):
+def remove_outlier_and_empty_rows_inner(lower, upper, file):
     '''
-    Inner remove_empty_rows method for parallelization.
+    Inner remove_outlier_and_empty_rows method for parallelization.
+    @param lower: lower velocity border
+    @param upper: upper velocity border
     @param file: file to preprocess
+    @return: tuple of the maximum absolute value per column and the number of rows, None if the ride was removed
     '''
-    df = pd.read_csv(file)
-    df.dropna(inplace=True, axis=0)
+    # keep the rows in which every column holds a value, which does not change the velocity outliers
+    df = read_ride_table(file).drop_null().to_pandas()
+    df = remove_vel_outliers_df(lower, upper, df)
 
     if len(df) != 0:
-        df.to_csv(file, ',', index=False)
+        write_ride(df, file)
+        # the final ride is still in memory, so the statistics needed by the scaler are returned right away
+        return ride_max_abs(df)
     else:
         os.remove(file)
 
 
-def remove_empty_rows(dir, region='Berlin', pbar=None):
+def remove_outlier_and_empty_rows(dir, region='Berlin', verbose=3, pbar=None, pool=None):
     '''
-    Method to remove the empty rows in ride files.
+    Method that removes the velocity outliers and the empty rows with a single read and write per ride file.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
+    @param verbose: level of information displayed
     @param pbar: progress bar
+    @param pool: process pool to reuse, a new one is created if None
+    @return: list of the maximum absolute values per column and number of rows of the remaining train rides
     '''
+    lower, upper = vel_outlier_borders(dir, region, verbose)
+
     for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(remove_empty_rows_inner, file_list)
+        file_list = ride_files(dir, split, region)
 
-    pbar.update(1) if pbar is not None else print()
+        with pool_or_new(pool) as split_pool:
+            results = split_pool.map(partial(remove_outlier_and_empty_rows_inner, lower, upper), file_list)
+
+        if split == 'train':
+            train_stats = [result for result in results if result is not None]
+
+    pbar.update(2) if pbar is not None else print()
+
+    return train_stats
 
 
 def scale_inner(scaler_maxabs, lin_acc_flag, file):
@@ -487,27 +640,42 @@ def scale_inner(scaler_maxabs, lin_acc_flag, file):
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
     @param file: file to preprocess
     '''
-    df = pd.read_csv(file)
+    df = read_ride(file)
     if lin_acc_flag:
         df[['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c','XL','YL','ZL']] = scaler_maxabs.transform(
             df[['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c','XL','YL','ZL']])
         # change order of features and remove timestamp column
-        df[['X', 'Y', 'Z', 'a', 'b', 'c', 'XL', 'YL', 'ZL', 'lat', 'lon', 'incident']].to_csv(file, ',', index=False)
+        arr = df[['X', 'Y', 'Z', 'a', 'b', 'c', 'XL', 'YL', 'ZL', 'lat', 'lon', 'incident']].to_numpy(dtype=np.float32)
     else:
         df[['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c']] = scaler_maxabs.transform(
             df[['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c']])
         # change order of features and remove timestamp column
-        df[['X', 'Y', 'Z', 'a', 'b', 'c', 'lat', 'lon', 'incident']].to_csv(file, ',', index=False)
+        arr = df[['X', 'Y', 'Z', 'a', 'b', 'c', 'lat', 'lon', 'incident']].to_numpy(dtype=np.float32)
+
+    # scaled rides are only read by create_buckets, so they are stored as binary .npy files instead of csv
+    np.save(os.path.splitext(file)[0] + '.npy', arr)
+    os.remove(file)
 
 
-def scale(dir, region='Berlin', lin_acc_flag=False, verbose=3, pbar=None):
+def scaler_max_abs_inner(file):
+    '''
+    Inner scaler fit method for parallelization.
+    @param file: file to fit the scaler on
+    @return: tuple of the maximum absolute value per column and the number of rows
+    '''
+    return ride_max_abs(read_ride(file))
+
+
+def scale(dir, region='Berlin', lin_acc_flag=False, train_stats=None, verbose=3, pbar=None, pool=None):
     '''
     Method to scale the ride files.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
+    @param train_stats: maximum absolute values per column and number of rows of the train rides, they are read from the rides if None
     @param verbose: level of information displayed
     @param pbar: progress bar
+    @param pool: process pool to reuse, a new one is created if None
     '''
     scaler_maxabs = MaxAbsScaler()
 
@@ -520,28 +688,47 @@ def scale(dir, region='Berlin', lin_acc_flag=False, verbose=3, pbar=None):
         scaler_maxabs = joblib.load(scaler_file)
     else:
 
-        for file in glob.glob(os.path.join(dir, split, region, 'VM2_*.csv')):
-            df = pd.read_csv(file)
+        if lin_acc_flag:
+            columns = ['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c', 'XL', 'YL', 'ZL']
+        else:
+            columns = ['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c']
 
-            df.fillna(0, inplace=True)
+        # the maximum absolute values are computed per ride in parallel and combined afterwards
+        if train_stats is None:
+            file_list = ride_files(dir, split, region)
 
-            if lin_acc_flag:
-                scaler_maxabs.partial_fit(df[['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c', 'XL', 'YL', 'ZL']])
-            else:
-                scaler_maxabs.partial_fit(df[['lat', 'lon', 'X', 'Y', 'Z', 'a', 'b', 'c']])
+            with pool_or_new(pool) as split_pool:
+                train_stats = split_pool.map(scaler_max_abs_inner, file_list)
+
+        max_abs_list, num_rows_list = zip(*train_stats)
+
+        # fitting on the per ride maxima yields the same scaler as fitting on all rows
+        scaler_maxabs.partial_fit(pd.DataFrame(np.stack([max_abs[columns].to_numpy() for max_abs in max_abs_list]), columns=columns))
+        scaler_maxabs.n_samples_seen_ = int(np.sum(num_rows_list))
         if verbose < 2:
             print(scaler_maxabs.max_abs_)
-        joblib.dump(scaler_maxabs, os.path.join(dir, 'scaler.save'))
+        joblib.dump(scaler_maxabs, scaler_file)
 
     for split in ['train', 'test', 'val']:
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
+        file_list = ride_files(dir, split, region)
 
-        with mp.Pool(mp.cpu_count()) as pool:
-            pool.map(partial(scale_inner, scaler_maxabs, lin_acc_flag), file_list)
+        with pool_or_new(pool) as split_pool:
+            split_pool.map(partial(scale_inner, scaler_maxabs, lin_acc_flag), file_list)
 
     pbar.update(1) if pbar is not None else print()
 
 
+def write_npz_array(npz_file, name, arr):
+    '''
+    Method to write an array into an opened .npz file the same way np.savez stores it.
+    @param npz_file: zip file opened for writing
+    @param name: key of the array in the .npz file
+    @param arr: array to write
+    '''
+    with npz_file.open(name + '.npy', 'w', force_zip64=True) as f:
+        np.lib.format.write_array(f, np.asanyarray(arr), allow_pickle=False)
+
+
 def create_buckets(dir, region='Berlin', in_memory_flag=True, window_size=5, slices=20, class_counts_file='class_counts.csv', pbar=None):
     '''
     Method to create the buckets from the ride files.
@@ -557,56 +744,77 @@ def create_buckets(dir, region='Berlin', in_memory_flag=True, window_size=5, sli
 
     for split in ['train', 'test', 'val']:
 
-        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.csv'))
+        file_list = glob.glob(os.path.join(dir, split, region, 'VM2_*.npy'))
+
+        # buckets are streamed to disk per ride, so only one ride is held in memory
+        npz_file = zipfile.ZipFile(os.path.join(dir, split, region + '.npz'), mode='w', compression=zipfile.ZIP_STORED, allowZip64=True)
+        buckets_member = None
 
-        buckets_dict, buckets_list = {}, []
+        if in_memory_flag:
+            # count the buckets from the .npy headers first, so the single array can be written straight into the .npz file
+            ride_shapes = [np.load(file, mmap_mode='r').shape for file in file_list]
+
+            if len(ride_shapes) > 0:
+                num_buckets = sum(max(num_rows - 120, 0) // (window_size * slices) for num_rows, _ in ride_shapes)
+
+                buckets_member = npz_file.open('arr_0.npy', 'w', force_zip64=True)
+                np.lib.format.write_array_header_1_0(buckets_member, {'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                                                                      'fortran_order': False,
+                                                                      'shape': (num_buckets, window_size, slices, ride_shapes[0][1])})
+            else:
+                write_npz_array(npz_file, 'arr_0', np.array([]))
 
         pos_counter, neg_counter = 0, 0
+        written_buckets = 0
 
         for file in file_list:
 
-            arr = np.genfromtxt(file, delimiter=',', skip_header=True)
+            # scaled ride files only hold float32 sensor values and labels, copy on write keeps the file untouched by the labelling below
+            arr = np.load(file, mmap_mode='c')
 
             # remove first and last 60 measurements of a ride
             try:
                 arr = arr[60:-60, :]
-            except:
-                raise ValueError('not enough data points to remove')
+            except IndexError as e:
+                raise ValueError('not enough data points to remove') from e
 
             try:
 
-                range = (arr.shape[0] // (window_size * slices)) * window_size * slices
+                usable_rows = (arr.shape[0] // (window_size * slices)) * window_size * slices
 
-                arr = np.reshape(arr[:range, :], (int(range / (window_size * slices)), slices, window_size, arr.shape[1]))
+                # consecutive measurements fill the window of a slice, the transpose is only a view of the buckets
+                arr = np.reshape(arr[:usable_rows, :], (usable_rows // (window_size * slices), slices, window_size, arr.shape[1]))
                 arr = np.transpose(arr, axes=(0, 2, 1, 3))
 
-                labels = np.reshape(arr[:, :, :, -1], (arr.shape[0], slices * window_size))
-                labels = np.any(labels, axis=1)
+                labels = np.any(arr[:, :, :, -1], axis=(1, 2))
 
                 pos_counter += np.sum(labels)
                 neg_counter += len(labels) - np.sum(labels)
 
+                # label all measurements of a bucket with the bucket label
+                arr[:, :, :, -1] = labels[:, np.newaxis, np.newaxis]
+
                 if in_memory_flag:
-                    for i, bucket in enumerate(arr):
-                        bucket[:, :, -1] = labels[i]
-                        buckets_list.append(bucket)
+                    buckets_member.write(np.ascontiguousarray(arr))
+                    written_buckets += len(arr)
 
                 else:
-                    for i, bucket in enumerate(arr):
-                        bucket[:, :, -1] = labels[i]
+                    for i, label in enumerate(labels):
 
-                        if labels[i]:
-                            dict_name = os.path.basename(file).replace('.csv', '') + \
+                        if label:
+                            dict_name = os.path.splitext(os.path.basename(file))[0] + \
                                         '_no' + str(i).zfill(5) + '_bucket_incident'
                         else:
-                            dict_name = os.path.basename(file).replace('.csv', '') + \
+                            dict_name = os.path.splitext(os.path.basename(file))[0] + \
                                         '_no' + str(i).zfill(5) + '_bucket'
 
-                        buckets_dict.update({dict_name: bucket})
+                        write_npz_array(npz_file, dict_name, arr[i])
 
-            except:
-                raise ValueError('file')
+            except (ValueError, IndexError) as e:
+                raise ValueError(file) from e
 
+            # drop the last view of the memory map, so the file is closed before it is removed
+            del arr
             os.remove(file)
 
         class_counts_df['_'.join([split, region])] = [pos_counter, neg_counter]
@@ -615,53 +823,31 @@ def create_buckets(dir, region='Berlin', in_memory_flag=True, window_size=5, sli
 
         os.rmdir(os.path.join(dir, split, region))
 
-        if in_memory_flag:
-            # save as one array in .npz file
-            np.savez(os.path.join(dir, split, region + '.npz'), buckets_list)
-        else:
-            # save as seperate arrays in .npz file
-            np.savez(os.path.join(dir, split, region + '.npz'), **buckets_dict)
+        # in memory the buckets were saved as one array, off memory as seperate arrays in the .npz file
+        if buckets_member is not None:
+            # a header that promises more or fewer buckets than were written would leave an unreadable array
+            if written_buckets != num_buckets:
+                buckets_member.close()
+                npz_file.close()
+                raise ValueError('{} buckets written, but the header of {} holds {}'.format(written_buckets, npz_file.filename, num_buckets))
+            buckets_member.close()
+        npz_file.close()
 
     pbar.update(1) if pbar is not None else print()
 
 
-def rotate_bucket(bucket, axis):
+def rotate_buckets(buckets):
     '''
-    Method to rotate existing incident buckets for data augmentation.
-    @param bucket: bucket
-    @param axis: axis around which to rotate bucket
-    @return: rotated bucket
+    Method to rotate a batch of incident buckets around the X, Y and Z axis for data augmentation.
+    @param buckets: buckets of shape (n, window_size, slices, features)
+    @return: rotated buckets of shape (n, 3, window_size, slices, features)
     '''
-    if axis == 0:
-        # 180 degree rotation matrix around X axis
-        R = [[1, 0, 0],
-             [0, -1, 0],
-             [0, 0, -1]]
+    buckets_rotated = np.repeat(buckets[:, np.newaxis], 3, axis=1)
 
-    elif axis == 1:
-        # 180 degree rotation matrix around Y axis
-        R = [[-1, 0, 0],
-             [0, 1, 0],
-             [0, 0, -1]]
+    buckets_rotated[..., :3] = np.einsum('nwsk,rkj->nrwsj', buckets[..., :3], ROTATION_MATRICES)
+    buckets_rotated[..., 3:6] = np.einsum('nwsk,rkj->nrwsj', buckets[..., 3:6], ROTATION_MATRICES)
 
-    elif axis == 2:
-        # 180 degree rotation matrix around Z axis
-        R = [[-1, 0, 0],
-             [0, -1, 0],
-             [0, 0, 1]]
-
-    else:
-        return None
-
-    ride_image_acc = bucket[:, :, :3]
-    ride_image_gyro = bucket[:, :, 3:6]
-
-    ride_image_acc_rotated = np.matmul(ride_image_acc, R)
-    ride_image_gyro_rotated = np.matmul(ride_image_gyro, R)
-
-    ride_image_rotated = np.concatenate((ride_image_acc_rotated, ride_image_gyro_rotated, bucket[:, :, 6:]), axis=2)
-
-    return ride_image_rotated
+    return buckets_rotated
 
 
 def augment_data_inner(dir, region, rotation_flag, files):
@@ -675,36 +861,40 @@ def augment_data_inner(dir, region, rotation_flag, files):
     '''
 
     ride_data_dict = {}
-    data_loaded = np.load(os.path.join(dir, 'train', region + '.npz'))
+    data_loaded = load_npz(os.path.join(dir, 'train', region + '.npz'))
     pos_counter = 0
 
+    incident_files = []
+
     for file in files:
 
         ride_image = data_loaded[file]
 
         ride_data_dict.update({file: ride_image})
 
-        if rotation_flag:
+        if rotation_flag and np.any(ride_image[:, :, -1]):
+            incident_files.append(file)
 
-            if np.any(ride_image[:, :, -1]) > 0:
-                dict_name_rotated_X = file.replace('_bucket_incident', '') + '_rotated_X_bucket_incident'
-                dict_name_rotated_Y = file.replace('_bucket_incident', '') + '_rotated_Y_bucket_incident'
-                dict_name_rotated_Z = file.replace('_bucket_incident', '') + '_rotated_Z_bucket_incident'
+    if len(incident_files) > 0:
 
-                ride_image_rotated_X = rotate_bucket(ride_image, axis=0)
-                ride_image_rotated_Y = rotate_bucket(ride_image, axis=1)
-                ride_image_rotated_Z = rotate_bucket(ride_image, axis=2)
+        # rotate all incident buckets of this split at once
+        buckets_rotated = rotate_buckets(np.stack([ride_data_dict[file] for file in incident_files]))
 
-                ride_data_dict.update({dict_name_rotated_X: ride_image_rotated_X})
-                ride_data_dict.update({dict_name_rotated_Y: ride_image_rotated_Y})
-                ride_data_dict.update({dict_name_rotated_Z: ride_image_rotated_Z})
-                pos_counter += 3
+        for file, bucket_rotated in zip(incident_files, buckets_rotated):
+            for axis_name, ride_image_rotated in zip(['X', 'Y', 'Z'], bucket_rotated):
+                dict_name_rotated = file.replace('_bucket_incident', '') + '_rotated_' + axis_name + '_bucket_incident'
+                ride_data_dict.update({dict_name_rotated: ride_image_rotated})
+
+        pos_counter += 3 * len(incident_files)
+
+    # the buckets were copied out of the archive, which is rewritten by augment_data afterwards
+    close_npz_files()
 
     return ride_data_dict, pos_counter
 
 
 def augment_data(dir, region='Berlin', in_memory_flag=True, rotation_flag=False, gan_flag=False, num_epochs=1000,
-                 batch_size=128, latent_dim=100, input_shape=(None, 5, 20, 8), class_counts_file='class_counts.csv', gan_checkpoint_dir='gan_checkpoints', verbose=3, pbar=None):
+                 batch_size=128, latent_dim=100, input_shape=(None, 5, 20, 8), class_counts_file='class_counts.csv', gan_checkpoint_dir='gan_checkpoints', verbose=3, pbar=None, pool=None):
     '''
     Method for data augmentation via rotation or using the GAN.
     @param dir: path to the data directory with the exported files
@@ -720,32 +910,30 @@ def augment_data(dir, region='Berlin', in_memory_flag=True, rotation_flag=False,
     @param gan_checkpoint_dir: path to gan checkpoint directory
     @param verbose: level of information displayed
     @param pbar: progress bar
+    @param pool: process pool to reuse, a new one is created if None
     '''
     if rotation_flag or gan_flag:
 
-        class_counts_df = pd.read_csv(os.path.join(dir, class_counts_file))
+        train_npz = os.path.join(dir, 'train', region + '.npz')
+        class_counts_path = os.path.join(dir, class_counts_file)
+
+        class_counts_df = pd.read_csv(class_counts_path)
 
         pos_counter, neg_counter = class_counts_df['_'.join(['train', region])]
 
         if in_memory_flag:
-            data_loaded = np.load(os.path.join(dir, 'train', region + '.npz'))
+            data_loaded = np.load(train_npz)
             data = data_loaded['arr_0']
 
             if rotation_flag:
 
-                ride_images_list = [ride_image for ride_image in data]
+                incident_buckets = data[np.any(data[:, :, :, -1], axis=(1, 2))]
 
-                for ride_image in data:
+                # rotated buckets are appended in the order X, Y, Z per incident bucket
+                buckets_rotated = np.reshape(rotate_buckets(incident_buckets), (-1,) + data.shape[1:])
 
-                    if np.any(ride_image[:, :, -1]) > 0:
-                        ride_image_rotated_X = rotate_bucket(ride_image, axis=0)
-                        ride_image_rotated_Y = rotate_bucket(ride_image, axis=1)
-                        ride_image_rotated_Z = rotate_bucket(ride_image, axis=2)
-
-                        ride_images_list.append(ride_image_rotated_X)
-                        ride_images_list.append(ride_image_rotated_Y)
-                        ride_images_list.append(ride_image_rotated_Z)
-                        pos_counter += 3
+                data = np.concatenate([data, buckets_rotated.astype(data.dtype)], axis=0)
+                pos_counter += len(buckets_rotated)
 
             if gan_flag:
 
@@ -767,23 +955,22 @@ def augment_data(dir, region='Berlin', in_memory_flag=True, rotation_flag=False,
 
                 factor = 0.1
                 num_examples_to_generate = int((neg_counter - pos_counter) * factor)
-                generated_buckets = generator(tf.random.normal([num_examples_to_generate, latent_dim]), training=False)
-                generated_buckets = tf.concat([generated_buckets, tf.ones_like(generated_buckets)[:, :, :, :1]], axis=3)
+                generated_buckets = generate_buckets(generator, num_examples_to_generate, latent_dim)
 
-                data = tf.concat([tf.cast(data, tf.float32), generated_buckets], axis=0)
-                data = tf.random.shuffle(data)
+                data = np.concatenate([data.astype(np.float32, copy=False), generated_buckets], axis=0)
+                data = data[np.random.permutation(len(data))]
                 pos_counter += num_examples_to_generate
 
-            np.savez(os.path.join(dir, 'train', region + '.npz'), data)
+            np.savez(train_npz, data)
 
         else:
 
-            data_loaded = np.load(os.path.join(dir, 'train', region + '.npz'))
+            data_loaded = np.load(train_npz)
 
-            file_list_splits = np.array_split(data_loaded.files, mp.cpu_count())
+            file_list_splits = split_files(data_loaded.files, mp.cpu_count())
 
-            with mp.Pool(mp.cpu_count()) as pool:
-                results = pool.map(partial(augment_data_inner, dir, region, rotation_flag), file_list_splits)
+            with pool_or_new(pool) as split_pool:
+                results = split_pool.map(partial(augment_data_inner, dir, region, rotation_flag), file_list_splits)
 
             ride_data_dict = {}
             for ride_data_dict_local, pos_counter_local in results:
@@ -810,107 +997,247 @@ def augment_data(dir, region='Berlin', in_memory_flag=True, rotation_flag=False,
 
                 factor = 0.1
                 num_examples_to_generate = int((neg_counter - pos_counter) * factor)
-                generated_buckets = generator(tf.random.normal([num_examples_to_generate, latent_dim]),
-                                              training=False)
-
-                generated_buckets = tf.concat([generated_buckets, tf.ones_like(generated_buckets)[:, :, :, :1]], axis=3)
+                generated_buckets = generate_buckets(generator, num_examples_to_generate, latent_dim)
 
-                generated_dict = {'generated_bucket' + '_no' + str(i).zfill(15) + '_bucket_incident.csv':
-                                      generated_bucket for i, generated_bucket in enumerate(generated_buckets)}
+                # all generated buckets are stored as one stacked array instead of one .npz entry per bucket
+                ride_data_dict[GENERATED_BATCH_KEY] = generated_buckets
 
                 pos_counter += num_examples_to_generate
 
-                ride_data_dict.update(generated_dict)
-
-            np.savez(os.path.join(dir, 'train', region + '.npz'), **ride_data_dict)
+            np.savez(train_npz, **ride_data_dict)
 
         class_counts_df['_'.join(['train', region])] = [pos_counter, neg_counter]
-        class_counts_df.to_csv(os.path.join(dir, class_counts_file), ',', index=False)
+        class_counts_df.to_csv(class_counts_path, ',', index=False)
 
     pbar.update(1) if pbar is not None else print()
 
 
-def fourier_transform_off_memory(dir, split, region, file_list):
+def load_fft_wisdom(wisdom_file):
+    '''
+    Method to import the pyfftw wisdom of former runs once per process, which shortens the planning of the transforms.
+    @param wisdom_file: path to the wisdom file
+    '''
+    global fft_wisdom_loaded
+
+    if pyfftw is None or fft_wisdom_loaded or not os.path.isfile(wisdom_file):
+        return
+
+    pyfftw.import_wisdom(joblib.load(wisdom_file))
+    fft_wisdom_loaded = True
+
+
+def export_fft_wisdom():
+    '''
+    Method to export the pyfftw wisdom of this process, so that the plans of pool workers can be saved by the parent process.
+    @return: pyfftw wisdom, None if pyfftw is not installed
+    '''
+    return pyfftw.export_wisdom() if pyfftw is not None else None
+
+
+def save_fft_wisdom(wisdom_file, worker_wisdoms=()):
+    '''
+    Method to save the pyfftw wisdom gathered by the planned transforms for later runs.
+    @param wisdom_file: path to the wisdom file
+    @param worker_wisdoms: pyfftw wisdom exported by pool workers, which is merged before saving
+    '''
+    if pyfftw is not None:
+        for wisdom in worker_wisdoms:
+            pyfftw.import_wisdom(wisdom)
+
+        joblib.dump(pyfftw.export_wisdom(), wisdom_file)
+
+
+def dft(arr, axis, threads=1, gpu_flag=False):
+    '''
+    Method to apply dft along one axis of a real array. A cached pyfftw plan is used if pyfftw is installed, otherwise scipy.
+    Only the non-negative frequencies are returned, the negative ones of a real signal are their complex conjugates.
+    @param arr: real array
+    @param axis: axis along which the dft is applied
+    @param threads: number of threads used for the transform
+    @param gpu_flag: whether to run the transform on the gpu via cupy if it is installed
+    @return: complex dft of the array with n // 2 + 1 frequencies along the axis
+    '''
+    n = arr.shape[axis]
+
+    # single precision input is transformed in single precision
+    real_dtype = np.float32 if arr.dtype == np.float32 else np.float64
+    complex_dtype = np.complex64 if arr.dtype == np.float32 else np.complex128
+
+    # only the non-negative frequencies of the real signal are computed
+    if gpu_flag and cupy is not None:
+        spectrum_half = cupy.asnumpy(cupy.fft.rfft(cupy.asarray(arr), axis=axis))
+
+    elif pyfftw is None:
+        # scipy splits the independent transforms along the other axes between its workers
+        spectrum_half = scipy.fft.rfft(arr, axis=axis, workers=threads)
+
+    else:
+        key = (arr.shape, real_dtype, axis, threads)
+
+        if key not in fft_plans:
+            half_shape = arr.shape[:axis] + (n // 2 + 1,) + arr.shape[axis + 1:]
+            input_array = pyfftw.empty_aligned(arr.shape, dtype=real_dtype)
+            output_array = pyfftw.empty_aligned(half_shape, dtype=complex_dtype)
+            fft_plans[key] = pyfftw.FFTW(input_array, output_array, axes=(axis,), threads=threads,
+                                         flags=('FFTW_MEASURE', 'FFTW_DESTROY_INPUT'))
+
+        plan = fft_plans[key]
+        plan.input_array[...] = arr
+
+        # the output array belongs to the plan and is overwritten by the next transform
+        spectrum_half = plan()
+
+    return spectrum_half
+
+
+def fourier_transform_buckets(buckets, threads=1, out=None, gpu_flag=False):
+    '''
+    Method to apply dft along the window axis of the sensor channels of buckets.
+    @param buckets: buckets of shape (n, window_size, slices, features) with gps and label as last three features
+    @param threads: number of threads used for the transform
+    @param out: optional float32 array the transformed buckets are written to
+    @param gpu_flag: whether to run the transform on the gpu
+    @return: buckets with the real and imaginary part of the sensor channels followed by gps and label
+    '''
+    # sensor values do not need double precision, which halves the fft work and the size of the saved buckets
+    buckets = buckets.astype(np.float32, copy=False)
+
+    num_sensor_channels = buckets.shape[-1] - 3
+
+    window_size = buckets.shape[1]
+    spectrum_half = dft(buckets[:, :, :, :num_sensor_channels], axis=1, threads=threads, gpu_flag=gpu_flag)
+    num_half = spectrum_half.shape[1]
+
+    # fill the output directly instead of concatenating temporary real, imag, gps and label arrays
+    if out is None:
+        out = np.empty(buckets.shape[:-1] + (2 * num_sensor_channels + 3,), dtype=np.float32)
+    buckets_transformed = out
+
+    # the complex spectrum is viewed as interleaved real and imaginary parts, which are written with strided copies
+    spectrum_parts = np.swapaxes(spectrum_half.view(np.float32).reshape(spectrum_half.shape + (2,)), -1, -2)
+    sensor_channels = buckets_transformed[:, :, :, :2 * num_sensor_channels].reshape(buckets.shape[:-1] + (2, num_sensor_channels))
+    np.copyto(sensor_channels[:, :num_half], spectrum_parts)
+
+    # the negative frequencies are filled as complex conjugates directly in the output, without a full complex spectrum
+    np.copyto(sensor_channels[:, num_half:], spectrum_parts[:, (window_size + 1) // 2 - 1:0:-1])
+    np.negative(sensor_channels[:, num_half:, :, 1], out=sensor_channels[:, num_half:, :, 1])
+    buckets_transformed[:, :, :, 2 * num_sensor_channels:] = buckets[:, :, :, num_sensor_channels:]
+
+    return buckets_transformed
+
+
+def fourier_transform_blocks(buckets, block_size, threads=1, gpu_flag=False):
+    '''
+    Method to apply dft to stacked buckets in fixed size blocks, which share one fft plan across all splits.
+    @param buckets: buckets of shape (n, window_size, slices, features) with gps and label as last three features
+    @param block_size: number of buckets transformed together
+    @param threads: number of threads used for the transform
+    @param gpu_flag: whether to run the transform on the gpu
+    @return: fourier transformed buckets
+    '''
+    buckets_transformed = np.empty(buckets.shape[:-1] + (2 * (buckets.shape[-1] - 3) + 3,), dtype=np.float32)
+
+    for start in range(0, len(buckets), block_size):
+        # the last block is shifted back to full size, so the splits do not plan an extra transform for their remainders
+        start = min(start, max(len(buckets) - block_size, 0))
+        fourier_transform_buckets(buckets[start:start + block_size], threads=threads, out=buckets_transformed[start:start + block_size],
+                                  gpu_flag=gpu_flag)
+
+    return buckets_transformed
+
+
+def fourier_transform_off_memory(dir, split, region, file_list, block_size=64):
     '''
     Method to apply dft to off memory ride files.
     @param dir: path to the data directory with the exported files
     @param split: target region of files that should be preprocessed
     @param file_list: list of files to preprocessed
-    @return: dictionary of fourier transformed buckets
+    @param block_size: number of buckets transformed together
+    @return: tuple of the dictionary of fourier transformed buckets and the pyfftw wisdom of this worker
     '''
     ride_data_dict = {}
 
-    data_loaded = np.load(os.path.join(dir, split, region + '.npz'))
+    load_fft_wisdom(os.path.join(dir, 'fftw_wisdom.pkl'))
 
-    for file in file_list:
-        ride_data = data_loaded[file]
-        label = ride_data[:, :, -1:]
+    data_loaded = load_npz(os.path.join(dir, split, region + '.npz'))
 
-        gps = ride_data[:, :, -3:-1]
-        ride_data_transformed = np.fft.fft(ride_data[:, :, :-3], axis=0)
+    # all buckets share the same shape, so they are transformed in blocks that are small enough to stay in cache
+    # between the fft and the assembly of the output, while still amortizing the per call overhead
+    for start in range(0, len(file_list), block_size):
+        block_files = file_list[start:start + block_size]
 
-        data_transformed_real = np.real(ride_data_transformed)
-        data_transformed_imag = np.imag(ride_data_transformed)
+        buckets = np.stack([data_loaded[file] for file in block_files])
 
-        ride_data_transformed = np.concatenate(
-            (data_transformed_real, data_transformed_imag, gps, label), axis=2)
+        ride_data_dict.update(zip(block_files, fourier_transform_buckets(buckets)))
 
-        ride_data_dict.update({file: ride_data_transformed})
+    # the archive is replaced by fourier_transform once all tasks of the split are done
+    close_npz_files()
 
-    return ride_data_dict
+    return ride_data_dict, export_fft_wisdom()
 
 
-def fourier_transform(dir, region='Berlin', in_memory_flag=True, fourier_transform_flag=False, pbar=None):
+def fourier_transform(dir, region='Berlin', in_memory_flag=True, fourier_transform_flag=False, gpu_fft_flag=False, block_size=1024, pbar=None, pool=None):
     '''
     Method to apply dft to the ride files.
     @param dir: path to the data directory with the exported files
     @param region: target region of files that should be preprocessed
     @param in_memory_flag: whether to store the dataset in one array or not
     @param fourier_transform_flag: whether to apply fourier transform or not
+    @param gpu_fft_flag: whether to transform the in memory and generated buckets on the gpu if cupy is installed
+    @param block_size: number of in memory or generated buckets transformed together, small enough for the fft input and packed
+     output of a block to stay in cache
     @param pbar: progress bar
+    @param pool: process pool to reuse, a new one with spawned workers is created if None
     '''
 
     if fourier_transform_flag:
 
+        wisdom_file = os.path.join(dir, 'fftw_wisdom.pkl')
+        load_fft_wisdom(wisdom_file)
+        worker_wisdoms = []
+
         for split in ['train', 'test', 'val']:
 
-            ride_data_dict = {}
+            npz_path = os.path.join(dir, split, region + '.npz')
 
-            if in_memory_flag:
-                data_loaded = np.load(os.path.join(dir, split, region + '.npz'))
-                data = data_loaded['arr_0']
+            # the transformed buckets are streamed into a new .npz file, which replaces the old one once it is complete
+            with zipfile.ZipFile(npz_path + '.tmp', mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as npz_file:
 
-                label = data[:, :, :, -1:]
+                if in_memory_flag:
+                    with np.load(npz_path) as data_loaded:
+                        data = data_loaded['arr_0']
 
-                gps = data[:, :, :,-3:-1]
-                data_transformed = np.fft.fft(data[:, :, :, :-3], axis=1)
-                data_transformed_real = np.real(data_transformed)
-                data_transformed_imag = np.imag(data_transformed)
+                    write_npz_array(npz_file, 'arr_0', fourier_transform_blocks(data, block_size, threads=mp.cpu_count(), gpu_flag=gpu_fft_flag))
 
-                data_transformed = np.concatenate((data_transformed_real, data_transformed_imag, gps, label), axis=3)
+                else:
+                    with np.load(npz_path) as data_loaded:
+                        file_list = [file for file in data_loaded.files if file != GENERATED_BATCH_KEY]
+                        file_list_splits = split_files(file_list, mp.cpu_count())
 
+                        if GENERATED_BATCH_KEY in data_loaded.files:
+                            write_npz_array(npz_file, GENERATED_BATCH_KEY,
+                                            fourier_transform_blocks(data_loaded[GENERATED_BATCH_KEY], block_size, threads=mp.cpu_count(),
+                                                                     gpu_flag=gpu_fft_flag))
 
-            else:
-                data_loaded = np.load(os.path.join(dir, split, region + '.npz'))
-                file_list_splits = np.array_split(data_loaded.files, mp.cpu_count())
-
-                with mp.Pool(mp.cpu_count()) as pool:
-                    results = pool.map(
-                        partial(fourier_transform_off_memory, dir, split, region), file_list_splits)
-                    ride_data_dict = {}
-                    for result in results:
-                        ride_data_dict.update(result)
-
-            if in_memory_flag:
-                np.savez(os.path.join(dir, split, region + '.npz'), data_transformed)
-            else:
-                np.savez(os.path.join(dir, split, region + '.npz'), **ride_data_dict)
+                    # a gan may have initialized tensorflow on the gpu in this process, new workers must not be forked from that state
+                    with pool_or_new(pool, 'spawn') as split_pool:
+                        for ride_data_dict, wisdom in split_pool.imap(partial(fourier_transform_off_memory, dir, split, region), file_list_splits):
+                            for file, ride_data_transformed in ride_data_dict.items():
+                                write_npz_array(npz_file, file, ride_data_transformed)
+
+                            # the off memory transforms are planned in the workers, whose wisdom is merged before saving
+                            if wisdom is not None:
+                                worker_wisdoms.append(wisdom)
+
+            os.replace(npz_path + '.tmp', npz_path)
+
+        save_fft_wisdom(wisdom_file, worker_wisdoms)
 
     pbar.update(1) if pbar is not None else print()
 
 
 def preprocess(dir, region='Berlin', interpolation_type='equidistant', time_interval=100, window_size=5, slices=20,
-               lin_acc_flag=False, in_memory_flag=True, fourier_transform_flag=True, rotation_flag=False,
+               lin_acc_flag=False, in_memory_flag=True, fourier_transform_flag=True, gpu_fft_flag=False, rotation_flag=False,
                gan_flag=True, num_epochs=1000, batch_size=128, latent_dim=100, input_shape=(None, 5, 20, 8),
                class_counts_file='class_counts.csv', gan_checkpoint_dir='./gan_checkpoints', verbose=3):
     '''
@@ -925,6 +1252,7 @@ def preprocess(dir, region='Berlin', interpolation_type='equidistant', time_inte
     @param lin_acc_flag: whether the linear accelerometer data was exported, too
     @param in_memory_flag: whether to store the dataset in one array or not
     @param fourier_transform_flag: whether to apply fourier transform or not
+    @param gpu_fft_flag: whether to apply the fourier transform on the gpu if cupy is installed
     @param rotation_flag: whether to use rotation for data augmentation
     @param gan_flag: whether to use a GAN for data augmentation
     @param num_epochs: training epochs GAN
@@ -936,25 +1264,25 @@ def preprocess(dir, region='Berlin', interpolation_type='equidistant', time_inte
     @param verbose: level of information displayed
     '''
 
-    with tqdm(total=12, desc='preprocess') as pbar:
-        sort_timestamps(dir=dir, region=region, pbar=pbar)
-        remove_invalid_rides(dir=dir, region=region, pbar=pbar)
-        remove_sensor_values_from_gps_timestamps(dir=dir, region=region, lin_acc_flag=lin_acc_flag, pbar=pbar)
-        remove_acc_outliers(dir=dir, region=region, pbar=pbar)
-        calc_vel_delta(dir=dir, region=region, pbar=pbar)
-        interpolate(dir=dir, region=region, time_interval=time_interval, interpolation_type=interpolation_type,
-                    lin_acc_flag=lin_acc_flag, pbar=pbar)
-        remove_vel_outliers(dir=dir, region=region, verbose=verbose, pbar=pbar)
-        remove_empty_rows(dir=dir, region=region, pbar=pbar)
-        scale(dir=dir, region=region, lin_acc_flag=lin_acc_flag, verbose=verbose, pbar=pbar)
+    # one process pool is shared by the stages up to the augmentation, workers are recycled to bound their memory
+    with tqdm(total=12, desc='preprocess') as pbar, mp.Pool(mp.cpu_count(), maxtasksperchild=100) as pool:
+        # the per ride steps between the global statistics are fused, so each ride file is only read and written once per group
+        clean_rides(dir=dir, region=region, lin_acc_flag=lin_acc_flag, pbar=pbar, pool=pool)
+        resample_rides(dir=dir, region=region, time_interval=time_interval, interpolation_type=interpolation_type,
+                       lin_acc_flag=lin_acc_flag, pbar=pbar, pool=pool)
+        train_stats = remove_outlier_and_empty_rows(dir=dir, region=region, verbose=verbose, pbar=pbar, pool=pool)
+        scale(dir=dir, region=region, lin_acc_flag=lin_acc_flag, train_stats=train_stats, verbose=verbose, pbar=pbar, pool=pool)
         create_buckets(dir=dir, region=region, in_memory_flag=in_memory_flag, window_size=window_size,
                        slices=slices, class_counts_file=class_counts_file, pbar=pbar)
 
         augment_data(dir=dir, region=region, in_memory_flag=in_memory_flag, rotation_flag=rotation_flag, gan_flag=gan_flag, num_epochs=num_epochs,
                      batch_size=batch_size, latent_dim=latent_dim, input_shape=input_shape, class_counts_file=class_counts_file,
-                     gan_checkpoint_dir=gan_checkpoint_dir, verbose=verbose, pbar=pbar)
+                     gan_checkpoint_dir=gan_checkpoint_dir, verbose=verbose, pbar=pbar, pool=pool)
 
-        fourier_transform(dir=dir, region=region, in_memory_flag=in_memory_flag, fourier_transform_flag=fourier_transform_flag, pbar=pbar)
+        # the gan initializes tensorflow on the gpu, the shared pool would fork its replacement workers from that state,
+        # so the fourier transform spawns its own workers then
+        fourier_transform(dir=dir, region=region, in_memory_flag=in_memory_flag, fourier_transform_flag=fourier_transform_flag,
+                          gpu_fft_flag=gpu_fft_flag, pbar=pbar, pool=None if gan_flag else pool)
 
 
 def main(argv):
@@ -968,6 +1296,7 @@ def main(argv):
     parser.add_argument('--lin_acc_flag', metavar='<bool>', type=bool, help='whether the linear accelerometer data was exported, too', required=False, default=False)
     parser.add_argument('--in_memory_flag', metavar='<bool>', type=bool, help='whether to store the dataset in one arrray or not', required=False, default=True)
     parser.add_argument('--fourier_transform_flag', metavar='<bool>', type=bool, help='whether to apply fourier transform or not', required=False, default=True)
+    parser.add_argument('--gpu_fft_flag', metavar='<bool>', type=bool, help='whether to apply fourier transform on the gpu or not', required=False, default=False)
     parser.add_argument('--rotation_flag', metavar='<bool>', type=bool, help='whether to use rotation for data augmentation', required=False, default=False)
     parser.add_argument('--gan_flag', metavar='<bool>', type=bool, help='whether to use a GAN for data augmentation', required=False, default=True)
     parser.add_argument('--num_epochs', metavar='<int>', type=int, help='training epochs GAN', required=False, default=1000)
@@ -981,7 +1310,7 @@ def main(argv):
     input_shape = (None, args.window_size, args.slices, 8 + 3 * args.lin_acc_flag)
     preprocess(dir=args.dir, region=args.region, interpolation_type=args.interpolation_type, time_interval=args.time_interval, window_size=args.window_size,
                slices=args.slices, lin_acc_flag=args.lin_acc_flag, in_memory_flag=args.in_memory_flag, fourier_transform_flag=args.fourier_transform_flag,
-               rotation_flag=args.rotation_flag, gan_flag=args.gan_flag, num_epochs=args.num_epochs, batch_size=args.batch_size, latent_dim=args.latent_dim,
+               gpu_fft_flag=args.gpu_fft_flag, rotation_flag=args.rotation_flag, gan_flag=args.gan_flag, num_epochs=args.num_epochs, batch_size=args.batch_size, latent_dim=args.latent_dim,
                input_shape=input_shape, class_counts_file=args.class_counts_file, gan_checkpoint_dir=args.gan_checkpoint_dir, verbose=args.verbose)
 
 